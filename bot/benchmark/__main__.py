@@ -0,0 +1,51 @@
+import argparse
+import multiprocessing
+
+from bot.config import settings
+from bot.utils.event_loop import LOOP_BACKENDS
+from .runner import run_on_backend, setup_logger, format_report, format_comparison
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bot.benchmark",
+                                     description="Run simulated sessions against a local mock of the Agent301 API")
+    parser.add_argument("-n", "--sessions", type=int, default=1000, help="Number of simulated sessions")
+    parser.add_argument("-c", "--cycles", type=int, default=1, help="Cycles per session")
+    parser.add_argument("--concurrency", type=int, default=None, help="Sessions running at once (default: SCHEDULER_WORKERS)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mean mock API latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock API requests answered with 500")
+    parser.add_argument("--sleep-scale", type=float, default=0.0, help="Multiplier for MINI_SLEEP/TASK_SLEEP/COMPLETE_TASK_SLEEP")
+    parser.add_argument("--rate-limits", action="store_true", help="Apply the RATE_LIMIT_* settings instead of running unthrottled")
+    parser.add_argument("--profile", action="store_true", help="Log slow callbacks, loop lag and the hottest lines on the event loop")
+    parser.add_argument("--loop", nargs="+", choices=LOOP_BACKENDS, default=[settings.LOOP_BACKEND],
+                        help="Event loop backends to compare, each one runs in its own process (default: LOOP_BACKEND)")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for bot output during the run")
+    args = parser.parse_args()
+
+    options = dict(
+        sessions=args.sessions,
+        cycles=args.cycles,
+        concurrency=args.concurrency,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        sleep_scale=args.sleep_scale,
+        rate_limits=args.rate_limits,
+        profile=args.profile
+    )
+
+    if len(args.loop) == 1:
+        print(format_report(run_on_backend(args.loop[0], args.log_level, options)))
+        return
+
+    setup_logger(args.log_level)
+    context = multiprocessing.get_context('spawn')
+    reports = []
+    for backend in args.loop:
+        with context.Pool(1) as pool:
+            report = pool.apply(run_on_backend, (backend, args.log_level, options))
+        print(format_report(report), end="\n\n")
+        reports.append(report)
+
+    print(format_comparison(reports))
+
+if __name__ == '__main__':
+    main()
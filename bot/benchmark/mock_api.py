@@ -0,0 +1,139 @@
+import asyncio
+import json
+import random
+
+from urllib.parse import quote
+from aiohttp import web
+
+from bot.utils.clock import clock
+
+DEFAULT_TASKS = [
+    {'type': 'video', 'max_count': 10},
+    {'type': 'tg_channel', 'max_count': 1},
+    {'type': 'x_follow', 'max_count': 1},
+    {'type': 'youtube', 'max_count': 1},
+    {'type': 'boost', 'max_count': 1},
+]
+
+WHEEL_REWARDS = ['c1000', 'c10000', 't1', 't3', 'tc1', 'nt1', 'nt5']
+
+def fake_web_app_data(user_id: int, auth_date: int | None = None) -> str:
+    # Тот же формат, что и tgWebAppData из RequestAppWebView
+    user = quote(json.dumps({'id': user_id, 'first_name': f'Bench{user_id}', 'username': f'bench{user_id}'}))
+    return f"query_id=AAH{user_id}&user={user}&auth_date={auth_date or int(clock.time())}&hash={user_id:064x}"
+
+class MockAgent301:
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, tickets: int = 3):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.tickets = tickets
+        self.users = {}
+        self.requests = {}
+
+    def get_user(self, authorization: str) -> dict:
+        # hash у поддельного initData постоянный для пользователя, так повторный логин не сбрасывает прогресс
+        user_key = authorization.rpartition('hash=')[2]
+        user = self.users.get(user_key)
+        if user is None:
+            user = self.users[user_key] = {
+                'balance': 0,
+                'tickets': self.tickets,
+                'daily': int(clock.time()) - 1,
+                'rps': False,
+                'bird': False,
+                'tasks': {task['type']: {**task, 'is_claimed': False, 'count': 0} for task in DEFAULT_TASKS},
+            }
+        return user
+
+    async def handle(self, path: str, payload: dict, authorization: str | None) -> tuple[int, dict]:
+        self.requests[path] = self.requests.get(path, 0) + 1
+
+        if self.latency:
+            await asyncio.sleep(random.uniform(self.latency / 2, self.latency * 1.5))
+
+        if self.error_rate and random.random() < self.error_rate:
+            return 500, {'ok': False, 'error': 'Internal Server Error'}
+
+        if not authorization:
+            return 401, {'ok': False, 'error': 'Unauthorized'}
+
+        handler = getattr(self, 'handle_' + path.strip('/').replace('/', '_'), None)
+        if handler is None:
+            return 404, {'ok': False, 'error': 'Not Found'}
+
+        return 200, handler(self.get_user(authorization), payload)
+
+    def handle_getMe(self, user: dict, payload: dict) -> dict:
+        return {'ok': True, 'result': {
+            'balance': user['balance'],
+            'tickets': user['tickets'],
+            'daily_streak': {'showed': False, 'day': 1},
+        }}
+
+    def handle_getTasks(self, user: dict, payload: dict) -> dict:
+        return {'ok': True, 'result': {'data': [dict(task) for task in user['tasks'].values()]}}
+
+    def handle_completeTask(self, user: dict, payload: dict) -> dict:
+        task = user['tasks'].get(payload.get('type'))
+        if task is None or task['is_claimed']:
+            return {'ok': False}
+
+        task['count'] += 1
+        task['is_claimed'] = task['count'] >= task['max_count']
+        user['balance'] += 1000
+        return {'ok': True, 'result': {'reward': 1000, 'balance': user['balance']}}
+
+    def handle_wheel_load(self, user: dict, payload: dict) -> dict:
+        return {'ok': True, 'result': {
+            'tasks': {'daily': user['daily'], 'rps': user['rps'], 'bird': user['bird']},
+            'tickets': user['tickets'],
+        }}
+
+    def handle_wheel_task(self, user: dict, payload: dict) -> dict:
+        task_type = payload.get('type')
+        if task_type == 'daily':
+            if int(clock.time()) < user['daily']:
+                return {'ok': False}
+            user['daily'] = int(clock.time()) + 86400
+        elif task_type in ('rps', 'bird') and not user[task_type]:
+            user[task_type] = True
+        else:
+            return {'ok': False}
+
+        user['tickets'] += 1
+        return {'ok': True, 'result': {'tickets': user['tickets']}}
+
+    def handle_wheel_spin(self, user: dict, payload: dict) -> dict:
+        if user['tickets'] <= 0:
+            return {'ok': False}
+
+        user['tickets'] -= 1
+        return {'ok': True, 'result': {
+            'reward': random.choice(WHEEL_REWARDS),
+            'toncoin': 0,
+            'notcoin': 0,
+            'tickets': user['tickets'],
+        }}
+
+def create_app(api: MockAgent301) -> web.Application:
+    async def handler(request: web.Request) -> web.Response:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            payload = {}
+
+        status, body = await api.handle(request.match_info['path'], payload, request.headers.get('Authorization'))
+        return web.json_response(body, status=status)
+
+    app = web.Application()
+    app.router.add_post('/{path:.+}', handler)
+    return app
+
+async def start_server(api: MockAgent301, host: str = '127.0.0.1', port: int = 0) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(create_app(api), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import sys
+import tempfile
+import aiohttp
+
+from time import perf_counter, process_time
+
+from bot.config import settings
+from bot.core.tapper import Tapper
+from bot.utils.connection_manager import connection_manager
+from bot.utils.session_index import session_index
+from bot.utils.state_store import state_store
+from bot.utils.profiling import profiler
+from bot.utils import logger, event_loop
+from .mock_api import MockAgent301, fake_web_app_data, start_server
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class BenchTapper(Tapper):
+    def __init__(self, session_name: str, user_id: int):
+        super().__init__(session_name=session_name, proxy=None)
+        self.user_id = user_id
+
+    async def get_tg_web_data(self):
+        init_data = fake_web_app_data(self.user_id)
+        self.headers['Authorization'] = init_data
+        self.tg_acc_info = self.get_dict(query=init_data)
+        return True
+
+def count_open_sockets() -> int:
+    try:
+        fds = os.listdir('/proc/self/fd')
+    except OSError:
+        return -1
+
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f'/proc/self/fd/{fd}').startswith('socket:'):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+def get_peak_rss_mb() -> float:
+    if resource is None:
+        return -1.0
+    # ru_maxrss в килобайтах на Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+def scale_sleeps(scale: float) -> None:
+    settings.MINI_SLEEP = [value * scale for value in settings.MINI_SLEEP]
+    settings.TASK_SLEEP = [value * scale for value in settings.TASK_SLEEP]
+    settings.COMPLETE_TASK_SLEEP = [value * scale for value in settings.COMPLETE_TASK_SLEEP]
+
+def isolate_run(prefix: str, rate_limits: bool = False) -> None:
+    settings.USE_PROXY = False
+    settings.STATE_DB_PATH = os.path.join(tempfile.mkdtemp(prefix=prefix), 'state.db')
+    if not rate_limits:
+        settings.RATE_LIMIT_PER_ENDPOINT = settings.RATE_LIMIT_PER_PROXY = 0
+        settings.RATE_LIMITS = {}
+    # Бенчмарк и симуляция не должны трогать реальные файлы sessions/
+    session_index.loaded = True
+
+async def run_benchmark(sessions: int = 1000, cycles: int = 1, concurrency: int | None = None,
+                        latency: float = 0.02, error_rate: float = 0.0, sleep_scale: float = 0.0,
+                        rate_limits: bool = False, profile: bool = False) -> dict:
+    isolate_run('agent301-bench-', rate_limits)
+    scale_sleeps(sleep_scale)
+
+    api = MockAgent301(latency=latency, error_rate=error_rate)
+    server, settings.API_BASE_URL = await start_server(api)
+
+    latencies = []
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.start = perf_counter()
+
+    async def on_request_end(session, context, params):
+        latencies.append(perf_counter() - context.start)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    connection_manager.trace_configs.append(trace_config)
+
+    peak_sockets = 0
+
+    async def sample_sockets():
+        nonlocal peak_sockets
+        while True:
+            peak_sockets = max(peak_sockets, count_open_sockets())
+            await asyncio.sleep(0.1)
+
+    semaphore = asyncio.Semaphore(concurrency or settings.SCHEDULER_WORKERS)
+    tappers = [BenchTapper(f"bench-{i}", 100000 + i) for i in range(sessions)]
+    completed_cycles = 0
+
+    async def run_session(tapper: BenchTapper):
+        nonlocal completed_cycles
+        async with semaphore:
+            await tapper.prepare()
+            for _ in range(cycles):
+                await tapper.run_cycle()
+                completed_cycles += 1
+
+    if profile:
+        settings.PROFILING_ENABLED = True
+        settings.PROFILING_STACK_INTERVAL = settings.PROFILING_STACK_INTERVAL or 3600
+        profiler.start()
+
+    loop_name = event_loop.get_loop_name()
+    sampler = asyncio.create_task(sample_sockets())
+    started, cpu_started = perf_counter(), process_time()
+    try:
+        await asyncio.gather(*(run_session(tapper) for tapper in tappers))
+    finally:
+        elapsed, cpu_time = perf_counter() - started, process_time() - cpu_started
+        sampler.cancel()
+        profiler.stop()
+        connection_manager.trace_configs.remove(trace_config)
+        await connection_manager.close_all()
+        await server.cleanup()
+        await state_store.close()
+
+    return {
+        'loop': loop_name,
+        'sessions': sessions,
+        'cycles': completed_cycles,
+        'elapsed': elapsed,
+        'cycles_per_sec': completed_cycles / elapsed if elapsed else 0.0,
+        'cpu_time': cpu_time,
+        'cpu_per_session_ms': cpu_time / sessions * 1000 if sessions else 0.0,
+        'requests': len(latencies),
+        'requests_by_endpoint': dict(api.requests),
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+        'peak_rss_mb': get_peak_rss_mb(),
+        'peak_open_sockets': peak_sockets,
+    }
+
+def setup_logger(level: str) -> None:
+    logger.remove()
+    logger.add(sys.stderr, level=level, format="{time:HH:mm:ss} | {level: <8} | {message}")
+
+def run_on_backend(backend: str, log_level: str, options: dict) -> dict:
+    # Точка входа дочернего процесса: в каждом процессе свой цикл событий и свой пик RSS
+    setup_logger(log_level)
+    return event_loop.run(run_benchmark(**options), backend)
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Event loop:         {report['loop']}",
+        f"Sessions:           {report['sessions']}",
+        f"Cycles:             {report['cycles']} in {report['elapsed']:.2f}s ({report['cycles_per_sec']:.1f} cycles/sec)",
+        f"CPU time:           {report['cpu_time']:.2f}s ({report['cpu_per_session_ms']:.2f} ms per session)",
+        f"Requests:           {report['requests']}",
+        f"Latency p50 / p99:  {report['latency_p50_ms']:.1f} ms / {report['latency_p99_ms']:.1f} ms",
+        f"Peak RSS:           {report['peak_rss_mb']:.1f} MB",
+        f"Peak open sockets:  {report['peak_open_sockets']} (client and mock server)",
+    ]
+    lines += [f"  {endpoint:<16}  {count}" for endpoint, count in sorted(report['requests_by_endpoint'].items())]
+    return "\n".join(lines)
+
+def format_comparison(reports: list[dict]) -> str:
+    lines = [f"{'Event loop':<12}{'Cycles/sec':>12}{'CPU ms/session':>16}{'p50 ms':>10}{'p99 ms':>10}{'Peak RSS MB':>13}"]
+    lines += [
+        f"{report['loop']:<12}{report['cycles_per_sec']:>12.1f}{report['cpu_per_session_ms']:>16.2f}"
+        f"{report['latency_p50_ms']:>10.1f}{report['latency_p99_ms']:>10.1f}{report['peak_rss_mb']:>13.1f}"
+        for report in reports
+    ]
+    return "\n".join(lines)
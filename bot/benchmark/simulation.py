@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+
+from collections import Counter
+from datetime import datetime
+from functools import partial
+from time import perf_counter, process_time
+
+from bot.core.api import Agent301Client, loads, dumps
+from bot.core.scheduler import Scheduler
+from bot.utils.clock import clock
+from bot.utils.event_loop import run_with_factory
+from bot.utils.rate_limiter import rate_limiter
+from bot.utils.shutdown import shutdown
+from bot.utils.state_store import state_store
+from .mock_api import MockAgent301
+from .runner import BenchTapper, isolate_run, percentile, setup_logger
+from .virtual_time import VirtualEventLoop
+
+class InProcessClient(Agent301Client):
+    def __init__(self, api: MockAgent301, headers: dict, session_name: str = ''):
+        super().__init__(http_client=None, headers=headers, session_name=session_name)
+        self.mock_api = api
+
+    @property
+    def closed(self) -> bool:
+        return False
+
+    async def send(self, path: str, data: bytes) -> tuple[int, bytes]:
+        # Без сокетов: запрос сразу уходит в обработчик поддельного API
+        await rate_limiter.acquire(path, self.proxy)
+        status, body = await self.mock_api.handle(path, loads(data), self.headers.get('Authorization'))
+        return status, dumps(body)
+
+class SimTapper(BenchTapper):
+    def __init__(self, session_name: str, proxy: str | None, api: MockAgent301, wakeups: dict, user_ids: dict):
+        super().__init__(session_name, user_ids[session_name])
+        self.mock_api = api
+        self.wakeups = wakeups.setdefault(self.session_name, [])
+
+    def create_api_client(self) -> Agent301Client:
+        return InProcessClient(self.mock_api, self.headers, self.session_name)
+
+    async def run_cycle(self) -> int:
+        self.wakeups.append(clock.time())
+        return await super().run_cycle()
+
+async def run_simulation(sessions: int = 1000, days: float = 7, workers: int | None = None,
+                         latency: float = 0.2, error_rate: float = 0.0, rate_limits: bool = False) -> dict:
+    loop = asyncio.get_running_loop()
+    clock.install(loop)
+
+    isolate_run('agent301-sim-', rate_limits)
+
+    api = MockAgent301(latency=latency, error_rate=error_rate)
+    wakeups = {}
+    user_ids = {f"sim-{i}": 100000 + i for i in range(sessions)}
+    scheduler = Scheduler(workers, tapper_factory=partial(SimTapper, api=api, wakeups=wakeups, user_ids=user_ids))
+
+    duration = days * 86400
+    started_at = clock.time()
+    stop = loop.call_later(duration, shutdown.request, 'simulation finished')
+    started, cpu_started = perf_counter(), process_time()
+    try:
+        await scheduler.run(list(user_ids), {})
+    finally:
+        elapsed, cpu_time = perf_counter() - started, process_time() - cpu_started
+        stop.cancel()
+        await state_store.close()
+        clock.uninstall()
+
+    intervals = [later - earlier for times in wakeups.values() for earlier, later in zip(times, times[1:])]
+    all_wakeups = [wake_at for times in wakeups.values() for wake_at in times]
+    per_minute = Counter(int((wake_at - started_at) // 60) for wake_at in all_wakeups)
+    cycles = len(all_wakeups)
+    requests = sum(api.requests.values())
+
+    return {
+        'sessions': sessions,
+        'days': days,
+        'elapsed': elapsed,
+        'cpu_time': cpu_time,
+        'speedup': duration / elapsed if elapsed else 0.0,
+        'cycles': cycles,
+        'cycles_per_session_day': cycles / sessions / days if sessions and days else 0.0,
+        'requests': requests,
+        'requests_per_session_day': requests / sessions / days if sessions and days else 0.0,
+        'requests_by_endpoint': dict(api.requests),
+        'interval_hours': {percent: percentile(intervals, percent) / 3600 for percent in (1, 10, 50, 90, 99)},
+        'peak_wakeups_per_minute': max(per_minute.values(), default=0),
+        'wakeups_by_hour': Counter(datetime.fromtimestamp(wake_at).hour for wake_at in all_wakeups),
+    }
+
+def format_report(report: dict) -> str:
+    intervals = report['interval_hours']
+    lines = [
+        f"Sessions:               {report['sessions']}",
+        f"Simulated:              {report['days']:g} days in {report['elapsed']:.2f}s "
+        f"({report['speedup']:.0f}x real time, {report['cpu_time']:.2f}s CPU)",
+        f"Cycles:                 {report['cycles']} ({report['cycles_per_session_day']:.2f} per session per day)",
+        f"Requests:               {report['requests']} ({report['requests_per_session_day']:.1f} per session per day)",
+    ]
+    lines += [f"  {endpoint:<20}  {count}" for endpoint, count in sorted(report['requests_by_endpoint'].items())]
+    lines += [
+        "Wake-up interval, hours: " + " / ".join(f"p{percent} {value:.2f}" for percent, value in intervals.items()),
+        f"Peak wake-ups a minute: {report['peak_wakeups_per_minute']}",
+        "Wake-ups by hour of day:",
+    ]
+
+    by_hour = report['wakeups_by_hour']
+    peak = max(by_hour.values(), default=0)
+    for hour in range(24):
+        count = by_hour.get(hour, 0)
+        bar = '#' * round(count * 40 / peak) if peak else ''
+        lines.append(f"  {hour:02d}  {count:>8}  {bar}")
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bot.benchmark.simulation",
+                                     description="Replay days of the session schedule in virtual time against "
+                                                 "an in-process mock of the Agent301 API")
+    parser.add_argument("-n", "--sessions", type=int, default=1000, help="Number of simulated sessions")
+    parser.add_argument("-d", "--days", type=float, default=7, help="Simulated days")
+    parser.add_argument("--workers", type=int, default=None, help="Scheduler workers (default: SCHEDULER_WORKERS)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean mock API latency in simulated seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock API requests answered with 500")
+    parser.add_argument("--rate-limits", action="store_true", help="Apply the RATE_LIMIT_* settings instead of running unthrottled")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for bot output during the run")
+    args = parser.parse_args()
+
+    setup_logger(args.log_level)
+    report = run_with_factory(run_simulation(sessions=args.sessions, days=args.days, workers=args.workers,
+                                             latency=args.latency, error_rate=args.error_rate,
+                                             rate_limits=args.rate_limits), VirtualEventLoop)
+    print(format_report(report))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+import selectors
+
+class VirtualSelector(selectors.DefaultSelector):
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    def select(self, timeout: float | None = None):
+        loop = self.loop
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+
+        if loop.pending_jobs:
+            # Пока в потоках работают задачи (SQLite), виртуальное время стоит: ждём их по-настоящему
+            return super().select(None if timeout is None else min(timeout, 0.01))
+
+        if timeout is None:
+            # Таймеров нет, разбудить цикл могут только настоящие события
+            return super().select(None)
+
+        loop.advance(timeout)
+        return []
+
+# Время не идёт, а перескакивает к ближайшему таймеру. Сокеты и потоки работают как обычно,
+# поэтому код бота не меняется, а неделя расписания проходит за секунды
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, start: float = 0.0):
+        self.virtual_time = start
+        self.pending_jobs = 0
+        selector = VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+
+    def time(self) -> float:
+        return self.virtual_time
+
+    def advance(self, delay: float) -> None:
+        self.virtual_time += delay
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self.pending_jobs += 1
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future) -> None:
+        self.pending_jobs -= 1
@@ -6,6 +6,7 @@ class Settings(BaseSettings):
 
     API_ID: int
     API_HASH: str
+    API_BASE_URL: str = 'https://api.agent301.org'
 
     USE_RANDOM_DELAY_IN_RUN: bool = True
     RANDOM_DELAY_IN_RUN: list[int] = [0, 36000]
@@ -13,11 +14,68 @@ class Settings(BaseSettings):
     REF_CODE: str = 'onetime6434058521'
     MINI_SLEEP: list[int] = [7, 20]
     TASK_SLEEP: list[int] = [25, 50]
+    COMPLETE_TASK_SLEEP: list[int] = [20, 30]
     MAX_SPIN_PER_CYCLE: int = 5
     SLEEP_TIME: list[int] = [21000, 32000]
+    DUE_WAKE_MARGIN: list[int] = [30, 300]
     BLACKLIST: Set[str] = {'stars_purchase', 'invite_3_friends', 'transaction', 'boost', 'subscribe'}
 
     USE_PROXY: bool = False
+    PROXY_CHECK_URL: str = 'https://ipinfo.io/json'
+    PROXY_CHECK_TIMEOUT: int = 5
+    PROXY_CHECK_TTL: int = 600
+    PROXY_FAILURE_THRESHOLD: int = 3
+    PROXY_BREAKER_COOLDOWN: int = 300
+
+    CONNECTION_LIMIT_PER_HOST: int = 10
+    CONNECTION_KEEPALIVE_TIMEOUT: int = 60
+
+    RATE_LIMIT_PER_ENDPOINT: float = 10
+    RATE_LIMIT_PER_PROXY: float = 5
+    RATE_LIMIT_BURST: int = 5
+    RATE_LIMITS: dict[str, float] = {'completeTask': 2}
+
+    RETRY_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY: float = 1
+    RETRY_MAX_DELAY: float = 30
+    RETRY_DEADLINE: float = 120
+    RETRY_BUDGETS: dict[str, int] = {'TimeoutError': 2, 'ServerDisconnectedError': 3, 'ClientConnectorError': 3, 'ApiError': 3}
+    CYCLE_RETRY_BASE_DELAY: int = 60
+    CYCLE_RETRY_MAX_DELAY: int = 7200
+
+    TG_CLIENT_IDLE_TIMEOUT: int = 300
+    TG_CLIENT_CACHE_SIZE: int = 50
+    SESSION_STORAGE: str = 'file'
+    PREFLIGHT_ENABLED: bool = True
+    PREFLIGHT_WORKERS: int = 0
+    AUTH_CACHE_TTL: int = 43200
+
+    LOOP_BACKEND: str = 'asyncio'
+    SCHEDULER_WORKERS: int = 20
+    STATE_DB_PATH: str = 'sessions/state.db'
+
+    TASK_RETRY_INTERVAL: int = 86400
+
+    SUPERVISOR_STATUS_INTERVAL: int = 60
+    SUPERVISOR_RESTART_DELAY: int = 5
+    SHUTDOWN_TIMEOUT: int = 30
+
+    METRICS_ENABLED: bool = False
+    METRICS_HOST: str = '127.0.0.1'
+    METRICS_PORT: int = 9301
+
+    PROFILING_ENABLED: bool = False
+    SLOW_CALLBACK_THRESHOLD: float = 0.1
+    LOOP_LAG_THRESHOLD: float = 0.5
+    PROFILING_STACK_INTERVAL: int = 0
+    PROFILING_SAMPLE_INTERVAL: float = 0.005
+
+    LOG_LEVEL: str = 'DEBUG'
+    LOG_FORMAT: str = 'text'
+    LOG_ENQUEUE: bool = False
+    LOG_SESSION_FILES: bool = False
+    LOG_DIR: str = 'logs'
+    LOG_ROTATION_MB: int = 10
 
 
 settings = Settings()
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import aiohttp
+
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+from bot.config import settings
+from bot.exceptions import ApiError
+from bot.utils.rate_limiter import rate_limiter
+from bot.utils.retry import retry_policy
+from bot.utils.proxy_health import proxy_health
+from bot.utils import metrics
+from bot.utils.clock import clock
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    loads, dumps = orjson.loads, orjson.dumps
+else:
+    loads = json.loads
+
+    def dumps(data) -> bytes:
+        return json.dumps(data, separators=(',', ':')).encode()
+
+# Только эти запросы можно безопасно повторить после таймаута или 5xx: остальные меняют состояние на сервере
+IDEMPOTENT_ENDPOINTS = frozenset({'getMe', 'getTasks', 'wheel/load'})
+
+@dataclass(slots=True)
+class DailyStreak:
+    showed: bool
+    day: int
+
+@dataclass(slots=True)
+class Me:
+    balance: int
+    tickets: int
+    daily_streak: DailyStreak
+
+    @classmethod
+    def from_result(cls, result: dict) -> 'Me':
+        daily_streak = result['daily_streak']
+        return cls(
+            balance=result['balance'],
+            tickets=result['tickets'],
+            daily_streak=DailyStreak(showed=daily_streak['showed'], day=daily_streak['day'])
+        )
+
+@dataclass(slots=True)
+class Task:
+    type: str
+    is_claimed: bool
+    count: int
+    max_count: int
+
+    @classmethod
+    def from_result(cls, result: dict) -> 'Task':
+        return cls(
+            type=result['type'],
+            is_claimed=result.get('is_claimed', False),
+            count=result.get('count', 0),
+            max_count=result.get('max_count', 1)
+        )
+
+@dataclass(slots=True)
+class TaskResult:
+    ok: bool
+    reward: int
+
+@dataclass(slots=True)
+class WheelTasks:
+    daily: int
+    rps: bool
+    bird: bool
+
+@dataclass(slots=True)
+class WheelState:
+    tasks: WheelTasks
+    tickets: int
+
+    @classmethod
+    def from_result(cls, result: dict) -> 'WheelState':
+        tasks = result['tasks']
+        return cls(
+            tasks=WheelTasks(daily=tasks['daily'], rps=tasks['rps'], bird=tasks['bird']),
+            tickets=result.get('tickets', 0)
+        )
+
+@dataclass(slots=True)
+class SpinResult:
+    reward: str
+    toncoin: int
+    notcoin: int
+    tickets: int
+
+class ServerClock:
+    def __init__(self, smoothing: float = 0.2):
+        self.offset = 0.0
+        self.samples = 0
+        self.smoothing = smoothing
+        self.last_date = None
+
+    def update(self, date_header: str | None, sent_at: float, received_at: float) -> None:
+        # Date имеет точность в секунду: в пределах одной секунды новых сведений нет
+        if not date_header or date_header == self.last_date:
+            return
+        self.last_date = date_header
+
+        try:
+            server_time = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return
+
+        # Сервер ставит Date где-то между отправкой запроса и получением ответа
+        sample = server_time + 0.5 - (sent_at + received_at) / 2
+        self.offset = sample if not self.samples else self.offset + (sample - self.offset) * self.smoothing
+        self.samples += 1
+        metrics.server_clock_offset.set(self.offset)
+
+    def now(self) -> float:
+        return clock.time() + self.offset
+
+server_clock = ServerClock()
+
+class Agent301Client:
+    def __init__(self, http_client: aiohttp.ClientSession, headers: dict, proxy: str | None = None,
+                 session_name: str = ''):
+        self.http_client = http_client
+        self.proxy = proxy
+        self.session_name = session_name
+        # Тот же словарь, что и у Tapper: новый Authorization подхватывается без пересоздания клиента
+        self.headers = headers
+
+    @property
+    def closed(self) -> bool:
+        return self.http_client.closed
+
+    async def send(self, path: str, data: bytes) -> tuple[int, bytes]:
+        await rate_limiter.acquire(path, self.proxy)
+        try:
+            sent_at = clock.time()
+            async with self.http_client.post(f'{settings.API_BASE_URL}/{path}', data=data, headers=self.headers,
+                                             trace_request_ctx={'endpoint': path}) as response:
+                body = await response.read()
+            server_clock.update(response.headers.get('Date'), sent_at, clock.time())
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+            proxy_health.record_failure(self.proxy, error)
+            raise
+
+        proxy_health.record_success(self.proxy)
+        return response.status, body
+
+    async def post(self, path: str, data: bytes) -> bytes:
+        status, body = await self.send(path, data)
+        if status >= 400:
+            raise ApiError(path, status, body)
+        return body
+
+    async def request(self, path: str, payload: dict | None = None) -> dict:
+        body = await retry_policy.call(self.post, path, dumps(payload or {}),
+                                       endpoint=path, session_name=self.session_name,
+                                       idempotent=path in IDEMPOTENT_ENDPOINTS)
+        return loads(body)
+
+    async def result(self, path: str, payload: dict | None = None) -> dict:
+        response = await self.request(path, payload)
+        if 'result' not in response:
+            raise ApiError(path, 200, dumps(response))
+        return response['result']
+
+    async def get_me(self, referrer_id: int) -> Me:
+        return Me.from_result(await self.result('getMe', {'referrer_id': referrer_id}))
+
+    async def get_tasks(self) -> list[Task]:
+        result = await self.result('getTasks')
+        return [Task.from_result(task) for task in result['data']]
+
+    async def complete_task(self, task_type: str) -> TaskResult:
+        response = await self.request('completeTask', {'type': task_type})
+        if not response.get('ok'):
+            return TaskResult(ok=False, reward=0)
+        return TaskResult(ok=True, reward=response['result']['reward'])
+
+    async def load_wheel(self) -> WheelState:
+        return WheelState.from_result(await self.result('wheel/load'))
+
+    async def claim_wheel_task(self, task_type: str) -> bool:
+        response = await self.request('wheel/task', {'type': task_type})
+        return bool(response.get('ok'))
+
+    async def spin_wheel(self) -> SpinResult:
+        result = await self.result('wheel/spin')
+        return SpinResult(
+            reward=result['reward'],
+            toncoin=result.get('toncoin', 0),
+            notcoin=result.get('notcoin', 0),
+            tickets=result.get('tickets', 0)
+        )
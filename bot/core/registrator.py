@@ -1,12 +1,9 @@
 import asyncio
-import json
-import os
 from urllib.parse import urlparse
-from pyrogram import Client
 from bot.config import settings
 from bot.utils import logger
-
-PROXY_FILE_PATH = 'bot/config/proxies/session_proxy.json'
+from bot.utils.session_index import session_index
+from bot.utils.tg_manager import tg_manager
 
 def parse_proxy_string(proxy_string):
     if not proxy_string:
@@ -43,18 +40,9 @@ def get_proxy_input():
 
 def save_session_proxy(session_name, proxy_string):
     try:
-        if os.path.exists(PROXY_FILE_PATH):
-            with open(PROXY_FILE_PATH, 'r') as f:
-                proxies = json.load(f)
-        else:
-            proxies = {}
-
-        proxies[session_name] = proxy_string
-
-        with open(PROXY_FILE_PATH, 'w') as f:
-            json.dump(proxies, f, indent=4)
+        session_index.save_proxy(session_name, proxy_string)
 
-        logger.success(f"Session '{session_name}' and proxy have been saved to {PROXY_FILE_PATH}")
+        logger.success(f"Session '{session_name}' and proxy have been saved to {settings.STATE_DB_PATH}")
     except Exception as e:
         logger.error(f"Error saving session proxy: {e}")
 
@@ -75,13 +63,7 @@ async def register_sessions() -> None:
 
             proxy_string, proxy = get_proxy_input()
 
-            async with Client(
-                    name=session_name,
-                    api_id=API_ID,
-                    api_hash=API_HASH,
-                    workdir="sessions/",
-                    proxy=proxy
-            ) as session:
+            async with tg_manager.create_client(session_name, proxy) as session:
                 user_data = await session.get_me()
 
             logger.success(
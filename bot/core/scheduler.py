@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import random
+
+from bot.config import settings
+from bot.core.tapper import Tapper
+from bot.exceptions import InvalidSession
+from bot.utils import logger, metrics
+from bot.utils.state_store import state_store
+from bot.utils.preflight import mark_invalid
+from bot.utils.shutdown import shutdown
+from bot.utils.clock import clock
+
+# Через столько секунд повторяется цикл, упавший с непредвиденной ошибкой
+FALLBACK_DELAY = 3600
+
+class Scheduler:
+    def __init__(self, workers: int | None = None, tapper_factory=Tapper):
+        self.workers = workers or settings.SCHEDULER_WORKERS
+        # Симуляция подставляет свой Tapper, который ходит в поддельный API без сети
+        self.tapper_factory = tapper_factory
+        self.tappers = {}
+        self.prepared = set()
+        self.wake_times = {}
+        self.heap = []
+        self.queue = asyncio.Queue()
+        self.wakeup = asyncio.Event()
+        self.active = 0
+
+    def add(self, session_name: str, proxy: str | None, wake_at: float | None = None) -> None:
+        self.tappers[session_name] = self.tapper_factory(session_name=session_name, proxy=proxy)
+
+        if wake_at is None:
+            delay = 0
+            if settings.USE_RANDOM_DELAY_IN_RUN:
+                delay = random.randint(settings.RANDOM_DELAY_IN_RUN[0], settings.RANDOM_DELAY_IN_RUN[1])
+            wake_at = clock.time() + delay
+
+        self.push(session_name, wake_at)
+
+    def push(self, session_name: str, wake_at: float) -> None:
+        self.wake_times[session_name] = wake_at
+        heapq.heappush(self.heap, (wake_at, session_name))
+        self.wakeup.set()
+        self.update_metrics()
+
+    def update_metrics(self) -> None:
+        metrics.sessions_active.set(self.active)
+        metrics.sessions_sleeping.set(len(self.wake_times) - self.active)
+
+    async def remove(self, session_name: str) -> None:
+        self.wake_times.pop(session_name, None)
+        self.tappers.pop(session_name, None)
+        self.prepared.discard(session_name)
+        self.wakeup.set()
+        self.update_metrics()
+        await state_store.delete(session_name, 'next_wake')
+
+    def upcoming(self, limit: int = 10) -> list[tuple[float, str]]:
+        return sorted((wake_at, name) for name, wake_at in self.wake_times.items())[:limit]
+
+    async def run(self, session_names: list[str], proxies: dict) -> None:
+        saved = await state_store.get_all('next_wake')
+        for session_name in session_names:
+            if settings.USE_PROXY and not proxies.get(session_name):
+                logger.bind(session_name=session_name).error(f"{session_name} | No proxy found for this session")
+                continue
+            self.add(session_name, proxies.get(session_name), wake_at=saved.get(session_name))
+        await state_store.set_many([(name, 'next_wake', wake_at) for name, wake_at in self.wake_times.items()])
+
+        for wake_at, session_name in self.upcoming(len(self.wake_times)):
+            delay = max(int(wake_at - clock.time()), 0)
+            logger.bind(session_name=session_name).info(f"{session_name} | The Bot will go live in <y>{delay}s</y>")
+
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        try:
+            with shutdown.guard(self.wakeup.set):
+                await self.dispatch()
+                if shutdown.stopping:
+                    await self.drain()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def drain(self) -> None:
+        # Сессии, которые воркеры ещё не взяли, остаются в расписании с сохранённым next_wake
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+
+        if not self.active:
+            return
+
+        logger.info(f"Waiting for <cyan>{self.active}</cyan> running cycles to finish")
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=settings.SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.active} cycles did not finish in {settings.SHUTDOWN_TIMEOUT}s and were cancelled")
+
+    async def dispatch(self) -> None:
+        while self.wake_times and not shutdown.stopping:
+            if not self.heap:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            wake_at, session_name = self.heap[0]
+            if self.wake_times.get(session_name) != wake_at:
+                heapq.heappop(self.heap)
+                continue
+
+            delay = wake_at - clock.time()
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self.heap)
+            await self.queue.put(session_name)
+
+    async def worker(self) -> None:
+        while True:
+            session_name = await self.queue.get()
+            self.active += 1
+            self.update_metrics()
+            try:
+                await self.run_session(session_name)
+            except Exception as error:
+                # Воркер не должен завершиться из-за одного цикла, иначе пул тихо опустеет
+                logger.bind(session_name=session_name).error(
+                    "{} | Session cycle failed: {}. Retrying in {} seconds.", session_name, error, FALLBACK_DELAY)
+                # Если сессия уже успела получить новое время пробуждения, оставляем его
+                if session_name in self.tappers and self.wake_times.get(session_name, 0) <= clock.time():
+                    self.push(session_name, clock.time() + FALLBACK_DELAY)
+            finally:
+                self.active -= 1
+                self.update_metrics()
+                self.queue.task_done()
+
+    async def run_session(self, session_name: str) -> None:
+        tapper = self.tappers.get(session_name)
+        if tapper is None:
+            return
+
+        try:
+            if session_name not in self.prepared:
+                if not await tapper.prepare():
+                    await self.remove(session_name)
+                    return
+                self.prepared.add(session_name)
+
+            delay = await tapper.run_cycle()
+            metrics.cycles.inc()
+        except InvalidSession:
+            logger.bind(session_name=session_name).error(f"{session_name} | Invalid Session")
+            await mark_invalid(session_name, "rejected by Telegram")
+            await self.remove(session_name)
+            return
+        except Exception as error:
+            delay = FALLBACK_DELAY
+            logger.bind(session_name=session_name).error(
+                "{} | Unexpected error in scheduler: {}. Retrying in {} seconds.", session_name, error, delay)
+
+        wake_at = clock.time() + delay
+        self.push(session_name, wake_at)
+        await state_store.set(session_name, 'next_wake', wake_at)
@@ -1,42 +1,52 @@
 import asyncio
-import os
 import json
 import traceback
 import aiohttp
-import aiofiles
 import random
 
-from datetime import datetime, timedelta
-from aiohttp_proxy import ProxyConnector
+from dataclasses import asdict
+from datetime import timedelta
 from better_proxy import Proxy
 from typing import Tuple
 from pyrogram import Client
-from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered, FloodWait
+from pyrogram.errors import FloodWait, BadRequest
 from pyrogram.raw.functions.messages import RequestAppWebView
-from pyrogram.raw.types import InputBotAppShortName
+from pyrogram.raw.types import InputBotAppShortName, InputPeerUser
 from urllib.parse import unquote, parse_qs
 
 from bot.config import settings
 from bot.core.agents import generate_random_user_agent
-from bot.utils import logger
-from bot.exceptions import InvalidSession
+from bot.core.api import Agent301Client, Me, server_clock
+from bot.core.tasks import diff_tasks, update_known_tasks
+from bot.utils import logger, metrics
+from bot.exceptions import InvalidSession, ApiError
 from bot.utils.connection_manager import connection_manager
+from bot.utils.tg_manager import tg_manager
+from bot.utils.state_store import state_store
+from bot.utils.session_index import session_index
+from bot.utils.retry import cycle_delay
+from bot.utils.proxy_health import proxy_health
+from bot.utils.shutdown import shutdown
+from bot.utils.profiling import phase
+from bot.utils.clock import clock
 from .headers import headers
 
 class Tapper:
-    def __init__(self, tg_client: Client, proxy: str):
-        self.tg_client = tg_client
-        self.session_name = tg_client.name
+    def __init__(self, session_name: str, proxy: str | None):
+        self.session_name = session_name
+        self.logger = logger.bind(session_name=self.session_name)
         self.proxy = proxy
         self.ref = 'onetime6434058521'
 
-        self.user_agents_dir = "user_agents"
         self.session_ug_dict = {}
         self.headers = headers.copy()
+        self.failures = 0
 
     async def init(self):
-        os.makedirs(self.user_agents_dir, exist_ok=True)
-        await self.load_user_agents()
+        session_data = session_index.load().get_metadata(self.session_name)
+        if session_data:
+            self.session_ug_dict = {self.session_name: session_data}
+
         user_agent, sec_ch_ua = await self.check_user_agent()
         self.headers['User-Agent'] = user_agent
         self.headers['Sec-Ch-Ua'] = sec_ch_ua
@@ -45,55 +55,26 @@ class Tapper:
         user_agent, sec_ch_ua = generate_random_user_agent(device_type='android', browser_type='webview')
         return user_agent, sec_ch_ua
 
-    async def load_user_agents(self) -> None:
+    async def save_session_data(self) -> None:
         try:
-            os.makedirs(self.user_agents_dir, exist_ok=True)
-            filename = f"{self.session_name}.json"
-            file_path = os.path.join(self.user_agents_dir, filename)
-
-            if not os.path.exists(file_path):
-                logger.info(f"{self.session_name} | User agent file not found. A new one will be created when needed.")
-                return
-
-            try:
-                async with aiofiles.open(file_path, 'r') as user_agent_file:
-                    content = await user_agent_file.read()
-                    if not content.strip():
-                        logger.warning(f"{self.session_name} | User agent file '{filename}' is empty.")
-                        return
-
-                    data = json.loads(content)
-                    if data['session_name'] != self.session_name:
-                        logger.warning(f"{self.session_name} | Session name mismatch in file '{filename}'.")
-                        return
-
-                    self.session_ug_dict = {self.session_name: data}
-            except json.JSONDecodeError:
-                logger.warning(f"{self.session_name} | Invalid JSON in user agent file: {filename}")
-            except Exception as e:
-                logger.error(f"{self.session_name} | Error reading user agent file {filename}: {e}")
+            await session_index.save_metadata(self.session_name, self.session_ug_dict[self.session_name])
         except Exception as e:
-            logger.error(f"{self.session_name} | Error loading user agents: {e}")
+            self.logger.error(f"{self.session_name} | Error saving session data: {e}")
 
     async def save_user_agent(self) -> Tuple[str, str]:
         user_agent_str, sec_ch_ua = await self.generate_random_user_agent()
 
         new_session_data = {
+            **self.session_ug_dict.get(self.session_name, {}),
             'session_name': self.session_name,
             'user_agent': user_agent_str,
             'sec_ch_ua': sec_ch_ua
         }
 
-        file_path = os.path.join(self.user_agents_dir, f"{self.session_name}.json")
-        try:
-            async with aiofiles.open(file_path, 'w') as user_agent_file:
-                await user_agent_file.write(json.dumps(new_session_data, indent=4, ensure_ascii=False))
-        except Exception as e:
-            logger.error(f"{self.session_name} | Error saving user agent data: {e}")
-
         self.session_ug_dict = {self.session_name: new_session_data}
+        await self.save_session_data()
 
-        logger.info(f"{self.session_name} | User agent saved successfully: {user_agent_str}")
+        self.logger.info(f"{self.session_name} | User agent saved successfully: {user_agent_str}")
 
         return user_agent_str, sec_ch_ua
 
@@ -107,26 +88,8 @@ class Tapper:
 
         return session_data['user_agent'], session_data['sec_ch_ua']
 
-    async def check_proxy(self) -> bool:
-        try:
-            response = await self.http_client.get(url='https://ipinfo.io/json', timeout=aiohttp.ClientTimeout(total=5))
-            data = await response.json()
-
-            ip = data.get('ip')
-            city = data.get('city')
-            country = data.get('country')
-
-            logger.info(
-                f"{self.session_name} | Check proxy! Country: <cyan>{country}</cyan> | City: <light-yellow>{city}</light-yellow> | Proxy IP: {ip}")
-
-            return True
-
-        except Exception as error:
-            logger.error(f"{self.session_name} | Proxy error: {error}")
-            return False
-
     async def get_tg_web_data(self):
-        # logger.info(f"Getting data for {self.session_name}")
+        # self.logger.info(f"Getting data for {self.session_name}")
         if self.proxy:
             proxy = Proxy.from_str(self.proxy)
             proxy_dict = dict(
@@ -139,36 +102,24 @@ class Tapper:
         else:
             proxy_dict = None
 
-        self.tg_client.proxy = proxy_dict
-
         try:
-            if not self.tg_client.is_connected:
-                try:
-                    await self.tg_client.connect()
-                except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
-                    raise InvalidSession(self.session_name)
+            async with tg_manager.connect(self.session_name, proxy_dict) as tg_client:
+                peer = await self.get_bot_peer(tg_client)
 
-            while True:
                 try:
-                    peer = await self.tg_client.resolve_peer('Agent301Bot')
-                    break
-                except FloodWait as fl:
-                    fls = fl.value
-                    logger.warning(f"{self.session_name} | FloodWait {fl}")
-                    wait_time = random.randint(3600, 12800)
-                    logger.info(f"{self.session_name} | Sleep {wait_time}s")
-                    await asyncio.sleep(wait_time)
-
-            web_view = await self.tg_client.invoke(RequestAppWebView(
-                peer=await self.tg_client.resolve_peer('Agent301Bot'),
-                app=InputBotAppShortName(bot_id=await self.tg_client.resolve_peer('Agent301Bot'), short_name="app"),
-                platform='android',
-                write_allowed=True,
-                start_param=self.ref
-            ))
+                    web_view = await tg_client.invoke(RequestAppWebView(
+                        peer=peer,
+                        app=InputBotAppShortName(bot_id=peer, short_name="app"),
+                        platform='android',
+                        write_allowed=True,
+                        start_param=self.ref
+                    ))
+                except BadRequest:
+                    await self.forget_bot_peer()
+                    raise
 
             auth_url = web_view.url
-            self.http_client.headers['Authorization'] = unquote(
+            self.headers['Authorization'] = unquote(
                 string=auth_url.split('tgWebAppData=')[1].split('&tgWebAppVersion')[0]
             )
 
@@ -178,17 +129,63 @@ class Tapper:
 
             return True
 
-        except InvalidSession as error:
+        except (InvalidSession, FloodWait) as error:
             raise error
 
         except Exception as error:
-            logger.error(
+            self.logger.error(
                 f"<light-yellow>{self.session_name}</light-yellow> | Unknown error during Authorization: {error}")
-            await asyncio.sleep(delay=3)
+            await clock.sleep(delay=3)
+            return False
+
+    async def get_bot_peer(self, tg_client: Client) -> InputPeerUser:
+        session_data = self.session_ug_dict.get(self.session_name, {})
+        cached_peer = session_data.get('bot_peer')
+        if cached_peer:
+            return InputPeerUser(user_id=cached_peer['user_id'], access_hash=cached_peer['access_hash'])
+
+        # FloodWait уходит наверх: run_cycle переносит пробуждение сессии, не занимая воркер на время ожидания
+        peer = await tg_client.resolve_peer('Agent301Bot')
 
-        finally:
-            if self.tg_client.is_connected:
-                await self.tg_client.disconnect()
+        if self.session_name in self.session_ug_dict:
+            session_data['bot_peer'] = {'user_id': peer.user_id, 'access_hash': peer.access_hash}
+            await self.save_session_data()
+
+        return peer
+
+    async def forget_bot_peer(self) -> None:
+        session_data = self.session_ug_dict.get(self.session_name, {})
+        if session_data.pop('bot_peer', None):
+            await self.save_session_data()
+
+    def load_cached_auth(self) -> bool:
+        auth = self.session_ug_dict.get(self.session_name, {}).get('auth')
+        if not auth:
+            return False
+
+        if clock.time() - auth['auth_date'] >= settings.AUTH_CACHE_TTL:
+            return False
+
+        self.headers['Authorization'] = auth['authorization']
+        self.tg_acc_info = auth['tg_acc_info']
+        return True
+
+    async def save_auth(self) -> None:
+        if self.session_name not in self.session_ug_dict:
+            return
+
+        self.session_ug_dict[self.session_name]['auth'] = {
+            'authorization': self.headers['Authorization'],
+            'auth_date': int(self.tg_acc_info['auth_date'][0]),
+            'tg_acc_info': self.tg_acc_info
+        }
+        await self.save_session_data()
+
+    async def drop_auth(self) -> None:
+        self.headers.pop('Authorization', None)
+        session_data = self.session_ug_dict.get(self.session_name, {})
+        if session_data.pop('auth', None):
+            await self.save_session_data()
 
     def get_dict(self, query: str):
         parsed_query = parse_qs(query)
@@ -196,381 +193,396 @@ class Tapper:
         return parsed_query
 
     async def wheel(self, spin_count: int):
-        json_data = {}
-
-        response = await self.http_client.post('https://api.agent301.org/wheel/load', json=json_data)
-        response = await response.json()
-
-        if int(datetime.now().timestamp()) >= response['result']['tasks']['daily']:
-            json_data_daily = {
-                'type': 'daily',
-            }
-            daily_resp = await self.http_client.post('https://api.agent301.org/wheel/task', json=json_data_daily)
-            daily_resp = await daily_resp.json()
-            if daily_resp['ok']:
-                logger.success(f"{self.session_name} | Claimed 1 ticket for daily reward")
-            await asyncio.sleep(random.uniform(*settings.TASK_SLEEP))
+        wheel_state = await self.api.load_wheel()
+
+        if server_clock.now() >= wheel_state.tasks.daily:
+            if await self.api.claim_wheel_task('daily'):
+                # wheel/task не сообщает новый срок; точное значение придёт со следующим wheel/load
+                wheel_state.tasks.daily = int(server_clock.now()) + 86400
+                self.logger.success(f"{self.session_name} | Claimed 1 ticket for daily reward")
+            await shutdown.sleep(random.uniform(*settings.TASK_SLEEP))
         else:
-            time_left = timedelta(seconds=response['result']['tasks']['daily'] - int(datetime.now().timestamp()))
+            time_left = timedelta(seconds=int(wheel_state.tasks.daily - server_clock.now()))
             hours, remainder = divmod(time_left.seconds, 3600)
             minutes, _ = divmod(remainder, 60)
-            logger.info(
+            self.logger.info(
                 f"{self.session_name} | Daily reward of 1 ticket can be claimed in {hours}h {minutes}m"
             )
 
-        if not response['result']['tasks']['rps']:
-            json_data_rps = {
-                'type': 'rps',
-            }
-            rps_resp = await self.http_client.post('https://api.agent301.org/wheel/task', json=json_data_rps)
-            rps_resp = await rps_resp.json()
-            if rps_resp['ok']:
-                logger.success(f"{self.session_name} | Claimed 1 ticket for task")
-            await asyncio.sleep(random.uniform(*settings.TASK_SLEEP))
-
-
-        if not response['result']['tasks']['bird']:
-            json_data_bird = {
-                'type': 'bird',
-            }
-            bird_resp = await self.http_client.post('https://api.agent301.org/wheel/task', json=json_data_bird)
-            bird_resp = await bird_resp.json()
-            if bird_resp['ok']:
-                logger.success(f"{self.session_name} | Claimed 1 TICKET for task")
-            await asyncio.sleep(random.uniform(*settings.TASK_SLEEP))
+        if not wheel_state.tasks.rps:
+            if await self.api.claim_wheel_task('rps'):
+                wheel_state.tasks.rps = True
+                self.logger.success(f"{self.session_name} | Claimed 1 ticket for task")
+            await shutdown.sleep(random.uniform(*settings.TASK_SLEEP))
 
-        current_spin_count = spin_count
 
-        while current_spin_count > 0:
-            json_data = {}
+        if not wheel_state.tasks.bird:
+            if await self.api.claim_wheel_task('bird'):
+                wheel_state.tasks.bird = True
+                self.logger.success(f"{self.session_name} | Claimed 1 TICKET for task")
+            await shutdown.sleep(random.uniform(*settings.TASK_SLEEP))
 
+        await state_store.set(self.session_name, 'wheel', asdict(wheel_state))
+
+        current_spin_count = spin_count
+
+        while current_spin_count > 0 and not shutdown.stopping:
             try:
-                spin_resp = await self.http_client.post('https://api.agent301.org/wheel/spin', json=json_data)
-                spin_resp = await spin_resp.json()
+                spin = await self.api.spin_wheel()
 
-                toncoin = spin_resp['result'].get('toncoin', 0) / 100
-                notcoin = spin_resp['result'].get('notcoin', 0)
+                toncoin = spin.toncoin / 100
+                notcoin = spin.notcoin
 
-                logger.info(
+                self.logger.info(
                     f"{self.session_name} | Wheel balance: <green>{toncoin:.2f}</green> TON | <green>{notcoin}</green> NOT"
                 )
 
-                remaining_tickets = spin_resp['result'].get('tickets', 0)
-                result = spin_resp['result']['reward']
+                remaining_tickets = spin.tickets
+                result = spin.reward
 
                 if result == 'c1000':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 1,000 AP | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 1,000 AP | Remaining tickets: {remaining_tickets}")
                 elif result == 'c10000':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 10,000 AP | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 10,000 AP | Remaining tickets: {remaining_tickets}")
                 elif result == 't1':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 1 TICKET | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 1 TICKET | Remaining tickets: {remaining_tickets}")
                 elif result == 't3':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 3 TICKETS | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 3 TICKETS | Remaining tickets: {remaining_tickets}")
                 elif result == 'tc1':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 0.01 TON | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 0.01 TON | Remaining tickets: {remaining_tickets}")
                 elif result == 'tc4':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 4 TON | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 4 TON | Remaining tickets: {remaining_tickets}")
                 elif result == 'nt1':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 1 NOT | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 1 NOT | Remaining tickets: {remaining_tickets}")
                 elif result == 'nt5':
-                    logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 5 NOT | Remaining tickets: {remaining_tickets}")
+                    self.logger.success(f"{self.session_name} | <cyan>Reward:</cyan> 5 NOT | Remaining tickets: {remaining_tickets}")
 
-                current_spin_count = spin_resp['result'].get('tickets', 0)
+                current_spin_count = spin.tickets
 
             except Exception as e:
-                logger.error(f"{self.session_name} | Error during wheel spin: {e}")
+                self.logger.error(f"{self.session_name} | Error during wheel spin: {e}")
                 break
 
-            await asyncio.sleep(random.uniform(*settings.MINI_SLEEP))
+            await shutdown.sleep(random.uniform(*settings.MINI_SLEEP))
+
+    async def wheel_is_idle(self) -> bool:
+        wheel_state = await state_store.get(self.session_name, 'wheel')
+        if not wheel_state:
+            return False
+
+        wheel_tasks = wheel_state['tasks']
+        return server_clock.now() < wheel_tasks['daily'] and wheel_tasks['rps'] and wheel_tasks['bird']
 
-    async def complete_task(self, task: str, max_count: int = 1, reduced_count: int = 1, initial_count: int = 0):
+    async def complete_task(self, task: str, max_count: int = 1, reduced_count: int = 1, initial_count: int = 0) -> bool:
         count = initial_count
-        response = None
+        # Задача считается попробованной, только если API хоть раз ответил по существу
+        answered = False
 
         for i in range(reduced_count):
-            json_data = {
-                'type': task,
-            }
+            if shutdown.stopping:
+                break
 
             try:
-                async with self.http_client.post('https://api.agent301.org/completeTask', json=json_data) as response:
-                    response_text = await response.text()
-                    response.raise_for_status()
-                    response_json = await response.json()
-
-                    if 'ok' in response_json and response_json['ok']:
-                        count += 1
-                        if task == 'video':
-                            logger.success(
-                                f"{self.session_name} | Completed <light-yellow>{count}/{max_count}</light-yellow> (Planned: {reduced_count}): Received {response_json['result']['reward']} for task {task}"
-                            )
-                        else:
-                            logger.success(
-                                f"{self.session_name} | Received {response_json['result']['reward']} for task {task}"
-                            )
+                task_result = await self.api.complete_task(task)
+                answered = True
+
+                if task_result.ok:
+                    count += 1
+                    if task == 'video':
+                        self.logger.success(
+                            f"{self.session_name} | Completed <light-yellow>{count}/{max_count}</light-yellow> (Planned: {reduced_count}): Received {task_result.reward} for task {task}"
+                        )
                     else:
-                        logger.warning(f"{self.session_name} | Task completion unsuccessful. Response: {response_json}")
+                        self.logger.success(
+                            f"{self.session_name} | Received {task_result.reward} for task {task}"
+                        )
+                else:
+                    self.logger.warning(f"{self.session_name} | Task completion unsuccessful for task {task}")
 
-            except aiohttp.ClientResponseError as error:
-                logger.error(
-                    f"{self.session_name} | HTTP error during task completion: {error.status} - {error.message}")
+            except ApiError as error:
+                if error.status == 401:
+                    # Истёкшая авторизация ничего не говорит о самой задаче: повторим её после нового логина
+                    self.logger.warning(f"{self.session_name} | Authorization expired during task completion")
+                    await self.drop_auth()
+                    break
+                # 429 и 5xx — сбой на стороне сервера, задачу стоит повторить в следующем цикле
+                answered = answered or (error.status < 500 and error.status != 429)
+                self.logger.error(f"{self.session_name} | HTTP error during task completion: {error}")
             except aiohttp.ClientError as error:
-                logger.error(f"{self.session_name} | HTTP client error during task completion: {error}")
+                self.logger.error(f"{self.session_name} | HTTP client error during task completion: {error}")
             except asyncio.TimeoutError:
-                logger.error(f"{self.session_name} | Timeout error during task completion.")
-            except json.JSONDecodeError:
-                logger.error(f"{self.session_name} | Invalid JSON response: {response_text}")
+                self.logger.error(f"{self.session_name} | Timeout error during task completion.")
+            except json.JSONDecodeError as error:
+                self.logger.error(f"{self.session_name} | Invalid JSON response: {error}")
             except Exception as error:
-                logger.error(f"{self.session_name} | Unknown error during task completion: {error}")
-
-            delay = random.uniform(20, 30)
-            await asyncio.sleep(delay)
+                self.logger.error("{} | Unknown error during task completion: {}", self.session_name, error)
 
-        return response
+            delay = random.uniform(*settings.COMPLETE_TASK_SLEEP)
+            await shutdown.sleep(delay)
 
-    async def get_me(self):
-        try:
-            if str(self.tg_acc_info['user']['id']) == self.ref[7:]:
-                json_data = {'referrer_id': 0}
-            else:
-                json_data = {'referrer_id': int(self.ref[7:])}
-
-            async with self.http_client.post('https://api.agent301.org/getMe', json=json_data) as response:
-                status = response.status
-                headers = dict(response.headers)
-                try:
-                    body = await response.text()
-                    json_body = await response.json()
-                except:
-                    json_body = None
-                    body = await response.read()
+        return answered
 
-                full_response = {
-                    'status': status,
-                    'headers': headers,
-                    'body': body,
-                    'json': json_body
-                }
-
-                if status == 500:
-                    logger.error(f"{self.session_name} | Server returned 500 error for getMe.")
-                    logger.error(f"Full response: {full_response}")
-                    await asyncio.sleep(60)
-                    return None
+    async def get_me(self) -> Me | None:
+        if str(self.tg_acc_info['user']['id']) == self.ref[7:]:
+            referrer_id = 0
+        else:
+            referrer_id = int(self.ref[7:])
 
-                response.raise_for_status()
+        try:
+            return await self.api.get_me(referrer_id)
 
-                if 'result' not in json_body:
-                    logger.error(f"{self.session_name} | Invalid response from getMe: {full_response}")
-                    return None
+        except ApiError as error:
+            if error.status == 401:
+                self.logger.warning(f"{self.session_name} | Authorization expired. Requesting new WebApp data.")
+                await self.drop_auth()
+                return None
 
-                return json_body
+            if error.status >= 500:
+                self.logger.error(f"{self.session_name} | Server returned {error.status} error for getMe.")
+                return None
 
+            self.logger.error(f"{self.session_name} | Invalid response from getMe: {error}")
+            return None
         except aiohttp.ClientError as e:
-            logger.error(f"{self.session_name} | Error in getMe request: {e}")
-            logger.error(f"Request details: URL=https://api.agent301.org/getMe, Data={json_data}")
+            self.logger.error(f"{self.session_name} | Error in getMe request: {e}")
             return None
         except Exception as e:
-            logger.error(f"{self.session_name} | Unexpected error in getMe: {e}")
+            self.logger.error("{} | Unexpected error in getMe: {}", self.session_name, e)
             return None
 
-    async def get_tasks(self, max_retries=3, retry_delay=60):
-        for attempt in range(max_retries):
-            try:
-                json_data = {}
-                response = await self.http_client.post('https://api.agent301.org/getTasks', json=json_data)
-                response = await response.json()
-                return response
-            except aiohttp.ClientError as error:
-                logger.error(f"{self.session_name} | Error getting tasks (attempt {attempt + 1}/{max_retries}): {error}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay)
-                else:
-                    raise
-
-    async def login(self):
+    async def login(self, use_cache: bool = True):
         try:
+            if use_cache and self.load_cached_auth():
+                return True
+
             tg_web_data = await self.get_tg_web_data()
-            if tg_web_data == False:
+            if not tg_web_data:
                 return False
+
+            await self.save_auth()
             return True
+        except FloodWait:
+            raise
         except Exception as err:
-            logger.error(f"{self.session_name} | Login failed: {err}")
+            self.logger.error(f"{self.session_name} | Login failed: {err}")
             return False
 
-    async def run(self):
-        if settings.USE_RANDOM_DELAY_IN_RUN:
-            random_delay = random.randint(settings.RANDOM_DELAY_IN_RUN[0], settings.RANDOM_DELAY_IN_RUN[1])
-            logger.info(
-                f"{self.session_name} | The Bot will go live in <y>{random_delay}s</y>")
-            await asyncio.sleep(random_delay)
+    def retry_delay(self) -> int:
+        delay = cycle_delay(self.failures)
+        self.failures += 1
+        return delay
 
-        await self.init()
+    async def get_next_wake_delay(self) -> int:
+        # SLEEP_TIME остаётся верхней границей сна
+        next_claim = random.randint(settings.SLEEP_TIME[0], settings.SLEEP_TIME[1])
 
-        proxy_conn = ProxyConnector().from_url(self.proxy) if self.proxy else None
-        self.http_client = aiohttp.ClientSession(headers=self.headers, connector=proxy_conn)
-        connection_manager.add(self.http_client)
+        wheel_state = await state_store.get(self.session_name, 'wheel')
+        if not wheel_state:
+            return next_claim
 
-        if settings.USE_PROXY:
-            if not self.proxy:
-                logger.error(f"{self.session_name} | Proxy is not set. Aborting operation.")
-                return
-            if not await self.check_proxy():
-                logger.error(f"{self.session_name} | Proxy check failed. Aborting operation.")
-                return
+        due_in = wheel_state['tasks']['daily'] - server_clock.now()
+        if due_in <= 0:
+            return next_claim
 
-        while True:
-            try:
-                if self.http_client.closed:
-                    if proxy_conn:
-                        if not proxy_conn.closed:
-                            await proxy_conn.close()
+        due_delay = int(due_in) + random.randint(settings.DUE_WAKE_MARGIN[0], settings.DUE_WAKE_MARGIN[1])
+        if due_delay >= next_claim:
+            return next_claim
 
-                    proxy_conn = ProxyConnector().from_url(self.proxy) if self.proxy else None
-                    self.http_client = aiohttp.ClientSession(headers=self.headers, connector=proxy_conn)
-                    connection_manager.add(self.http_client)
+        self.logger.info(f"{self.session_name} | Daily wheel ticket is due in {int(due_in)}s, waking up for it")
+        return due_delay
 
-                login_success = await self.login()
-                if not login_success:
-                    logger.error(f"{self.session_name} | Login failed. Retrying in 1 hour.")
-                    await asyncio.sleep(3600)
-                    continue
-
-                logger.info(f"{self.session_name} | Login successfully!")
+    def create_api_client(self) -> Agent301Client:
+        self.http_client = connection_manager.get_session(self.proxy)
+        return Agent301Client(self.http_client, self.headers, self.proxy, self.session_name)
 
-                user = await self.get_me()
-                if user is None:
-                    logger.error(f"{self.session_name} | Failed to get user info. Retrying in 5 minutes.")
-                    await asyncio.sleep(300)
-                    continue
+    async def prepare(self) -> bool:
+        await self.init()
 
-                logger.info(
-                    f"{self.session_name} | Balance: <green>{user['result']['balance']:,}</green> | Tickets: <green>{user['result']['tickets']}</green>"
-                )
+        self.api = self.create_api_client()
 
-                if user['result']['daily_streak']['showed']:
-                    logger.info(
-                        f"{self.session_name} | Claim daily reward | Day <light-yellow>{user['result']['daily_streak']['day']}</light-yellow>"
-                    )
-                await asyncio.sleep(random.uniform(*settings.MINI_SLEEP))
+        if settings.USE_PROXY:
+            if not self.proxy:
+                self.logger.error(f"{self.session_name} | Proxy is not set. Aborting operation.")
+                return False
 
-                try:
-                    tasks_response = await self.get_tasks()
-                except Exception as e:
-                    logger.error(f"{self.session_name} | Failed to get tasks after several attempts: {e}")
-                    await asyncio.sleep(300)
-                    continue
-
-                if tasks_response is None or 'result' not in tasks_response or 'data' not in tasks_response['result']:
-                    logger.error(f"{self.session_name} | Invalid response from get_tasks. Skipping tasks.")
-                    await asyncio.sleep(300)
-                    continue
-
-                tasks = tasks_response['result']['data']
-
-                random.shuffle(tasks)
-                for task in tasks:
-                    if not task['is_claimed'] and task['type'] not in settings.BLACKLIST:
-                        if task['type'] == 'video':
-                            max_count = task.get('max_count', 1)
-                            count = task.get('count', 0)
-                            remaining_count = max(max_count - count, 0)
-                            reduced_count = max(remaining_count - random.randint(1, 4), 0)
+        return True
 
-                            await self.complete_task(task=task['type'], max_count=max_count,
-                                                     reduced_count=reduced_count, initial_count=count)
-                        else:
-                            await self.complete_task(task=task['type'], max_count=1)
+    async def run_cycle(self) -> int:
+        try:
+            if self.api.closed:
+                self.api = self.create_api_client()
 
-                tickets = min(user['result']['tickets'], settings.MAX_SPIN_PER_CYCLE)
-                try:
-                    await self.wheel(spin_count=tickets)
-                except Exception as wheel_error:
-                    logger.error(f"{self.session_name} | Error during wheel spin: {wheel_error}")
+            if settings.USE_PROXY and not await proxy_health.check(self.proxy):
+                delay = int(proxy_health.retry_after(self.proxy)) + random.randint(1, 60)
+                self.logger.warning(f"{self.session_name} | Proxy is unavailable. Skipping cycle, retrying in {delay} seconds.")
+                return delay
 
-            except aiohttp.ClientConnectorError as error:
-                delay = random.randint(1800, 3600)
-                logger.error(f"{self.session_name} | Connection error: {error}. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
+            with phase('login', self.session_name):
+                login_success = await self.login()
+                if not login_success:
+                    delay = self.retry_delay()
+                    self.logger.error(f"{self.session_name} | Login failed. Retrying in {delay} seconds.")
+                    return delay
 
+            self.logger.info(f"{self.session_name} | Login successfully!")
 
-            except aiohttp.ServerDisconnectedError as error:
-                delay = random.randint(900, 1800)
-                logger.error(f"{self.session_name} | Server disconnected: {error}. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
+            with phase('me', self.session_name):
+                user = await self.get_me()
+                if user is None and 'Authorization' not in self.headers and await self.login(use_cache=False):
+                    user = await self.get_me()
 
+            if user is None:
+                delay = self.retry_delay()
+                self.logger.error(f"{self.session_name} | Failed to get user info. Retrying in {delay} seconds.")
+                return delay
 
-            except aiohttp.ClientResponseError as error:
-                delay = random.randint(3600, 7200)
-                logger.error(
-                   f"{self.session_name} | HTTP response error: {error}. Status: {error.status}. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
+            await state_store.set(self.session_name, 'me', asdict(user))
 
+            self.logger.info(
+                f"{self.session_name} | Balance: <green>{user.balance:,}</green> | Tickets: <green>{user.tickets}</green>"
+            )
 
-            except aiohttp.ClientError as error:
-                delay = random.randint(3600, 7200)
-                logger.error(f"{self.session_name} | HTTP client error: {error}. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
+            if user.daily_streak.showed:
+                self.logger.info(
+                    f"{self.session_name} | Claim daily reward | Day <light-yellow>{user.daily_streak.day}</light-yellow>"
+                )
+            await shutdown.sleep(random.uniform(*settings.MINI_SLEEP))
 
+            if shutdown.stopping:
+                self.logger.info(f"{self.session_name} | Shutdown in progress. Skipping tasks")
+            else:
+                with phase('tasks', self.session_name):
+                    try:
+                        tasks = await self.api.get_tasks()
+                    except Exception as e:
+                        delay = self.retry_delay()
+                        self.logger.error(f"{self.session_name} | Failed to get tasks after several attempts: {e}. Retrying in {delay} seconds.")
+                        return delay
+
+                    known_tasks = await state_store.get(self.session_name, 'tasks', {})
+                    pending_tasks = diff_tasks(tasks, known_tasks)
+
+                    if not pending_tasks:
+                        self.logger.info(f"{self.session_name} | No new tasks to complete")
+
+                    random.shuffle(pending_tasks)
+                    attempted = set()
+                    for task in pending_tasks:
+                        if shutdown.stopping or 'Authorization' not in self.headers:
+                            break
+
+                        if task.type == 'video':
+                            max_count = task.max_count
+                            count = task.count
+                            remaining_count = max(max_count - count, 0)
+                            reduced_count = max(remaining_count - random.randint(1, 4), 0)
 
-            except asyncio.TimeoutError:
-                delay = random.randint(7200, 14400)
-                logger.error(f"{self.session_name} | Request timed out. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
+                            answered = await self.complete_task(task=task.type, max_count=max_count,
+                                                                reduced_count=reduced_count, initial_count=count)
+                        else:
+                            answered = await self.complete_task(task=task.type, max_count=1)
 
+                        if answered:
+                            attempted.add(task.type)
 
-            except InvalidSession as error:
-                logger.critical(f"{self.session_name} | Invalid Session: {error}. Manual intervention required.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                raise error
+                    await state_store.set(self.session_name, 'tasks', update_known_tasks(
+                        tasks, known_tasks, attempted=attempted))
 
+            tickets = min(user.tickets, settings.MAX_SPIN_PER_CYCLE)
 
-            except json.JSONDecodeError as error:
-                delay = random.randint(1800, 3600)
-                logger.error(f"{self.session_name} | JSON decode error: {error}. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
+            if shutdown.stopping:
+                self.logger.info(f"{self.session_name} | Shutdown in progress. Skipping wheel")
+            elif 'Authorization' not in self.headers:
+                self.logger.info(f"{self.session_name} | Authorization expired. Skipping wheel until the next login")
+            elif not tickets and await self.wheel_is_idle():
+                self.logger.info(f"{self.session_name} | No tickets and no wheel tasks available. Skipping wheel")
+            else:
+                with phase('wheel', self.session_name):
+                    try:
+                        await self.wheel(spin_count=tickets)
+                    except Exception as wheel_error:
+                        self.logger.error(f"{self.session_name} | Error during wheel spin: {wheel_error}")
+
+        except aiohttp.ClientConnectorError as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error(f"{self.session_name} | Connection error: {error}. Retrying in {delay} seconds.")
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
+
+        except aiohttp.ServerDisconnectedError as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error(f"{self.session_name} | Server disconnected: {error}. Retrying in {delay} seconds.")
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
+
+        except (aiohttp.ClientResponseError, ApiError) as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error(
+               f"{self.session_name} | HTTP response error: {error}. Status: {error.status}. Retrying in {delay} seconds.")
+            if isinstance(error, ApiError):
+                self.logger.opt(lazy=True).debug("Response body: {}", lambda: error.body[:200].decode(errors='replace'))
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
+
+        except aiohttp.ClientError as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error(f"{self.session_name} | HTTP client error: {error}. Retrying in {delay} seconds.")
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
+
+        except asyncio.TimeoutError as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error(f"{self.session_name} | Request timed out. Retrying in {delay} seconds.")
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
+
+        except FloodWait as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = error.value + random.randint(60, 600)
+            self.logger.warning(f"{self.session_name} | FloodWait {error.value}s from Telegram. Retrying in {delay} seconds.")
+            return delay
 
-            except KeyError as error:
-                delay = random.randint(1800, 3600)
-                logger.error(
-                    f"{self.session_name} | Key error: {error}. Possible API response change. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
+        except InvalidSession as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            self.logger.critical(f"{self.session_name} | Invalid Session: {error}. Manual intervention required.")
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            raise error
 
+        except json.JSONDecodeError as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error(f"{self.session_name} | JSON decode error: {error}. Retrying in {delay} seconds.")
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
+
+        except KeyError as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error(
+                f"{self.session_name} | Key error: {error}. Possible API response change. Retrying in {delay} seconds.")
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
 
-            except Exception as error:
-                delay = random.randint(7200, 14400)
-                logger.error(f"{self.session_name} | Unexpected error: {error}. Retrying in {delay} seconds.")
-                logger.debug(f"Full error details: {traceback.format_exc()}")
-                await asyncio.sleep(delay)
-
-            finally:
-                if self.http_client:
-                    await self.http_client.close()
-                    connection_manager.remove(self.http_client)
-                if proxy_conn and not proxy_conn.closed:
-                    await proxy_conn.close()
-
-                next_claim = random.randint(settings.SLEEP_TIME[0], settings.SLEEP_TIME[1])
-                hours = int(next_claim // 3600)
-                minutes = (int(next_claim % 3600)) // 60
-                logger.info(
-                    f"{self.session_name} | Sleep before wake up <yellow>{hours} hours</yellow> and <yellow>{minutes} minutes</yellow>")
-                await asyncio.sleep(next_claim)
-
-
-async def run_tapper(tg_client: Client, proxy: str | None):
-    session_name = tg_client.name
-    if settings.USE_PROXY and not proxy:
-        logger.error(f"{session_name} | No proxy found for this session")
-        return
-    try:
-        await Tapper(tg_client=tg_client, proxy=proxy).run()
-    except InvalidSession:
-        logger.error(f"{session_name} | Invalid Session")
+        except Exception as error:
+            metrics.cycle_errors.inc(type(error).__name__)
+            delay = self.retry_delay()
+            self.logger.error("{} | Unexpected error: {}. Retrying in {} seconds.", self.session_name, error, delay)
+            self.logger.opt(lazy=True).debug("Full error details: {}", traceback.format_exc)
+            return delay
+
+        self.failures = 0
+        if shutdown.stopping:
+            self.logger.info(f"{self.session_name} | Cycle interrupted by shutdown, rescheduling it")
+            return 0
+
+        next_claim = await self.get_next_wake_delay()
+        hours = int(next_claim // 3600)
+        minutes = (int(next_claim % 3600)) // 60
+        self.logger.info(
+            f"{self.session_name} | Sleep before wake up <yellow>{hours} hours</yellow> and <yellow>{minutes} minutes</yellow>")
+        return next_claim
@@ -0,0 +1,38 @@
+from bot.config import settings
+from bot.core.api import Task
+from bot.utils.clock import clock
+
+def task_signature(task: Task) -> list:
+    return [task.is_claimed, task.count, task.max_count]
+
+def diff_tasks(tasks: list[Task], known_tasks: dict[str, dict]) -> list[Task]:
+    now = clock.time()
+    pending = []
+
+    for task in tasks:
+        if task.is_claimed or task.type in settings.BLACKLIST:
+            continue
+
+        # Задача уже пробовалась и с тех пор не изменилась — ждём TASK_RETRY_INTERVAL
+        known = known_tasks.get(task.type)
+        if (known and known.get('attempted_at')
+                and known['signature'] == task_signature(task)
+                and now - known['attempted_at'] < settings.TASK_RETRY_INTERVAL):
+            continue
+
+        pending.append(task)
+
+    return pending
+
+def update_known_tasks(tasks: list[Task], known_tasks: dict[str, dict], attempted: set[str]) -> dict[str, dict]:
+    now = clock.time()
+    updated = {}
+
+    for task in tasks:
+        known = known_tasks.get(task.type, {})
+        updated[task.type] = {
+            'signature': task_signature(task),
+            'attempted_at': now if task.type in attempted else known.get('attempted_at')
+        }
+
+    return updated
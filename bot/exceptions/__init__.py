@@ -1,2 +1,10 @@
 class InvalidSession(BaseException):
     ...
+
+class ApiError(Exception):
+    def __init__(self, path: str, status: int, body: bytes = b''):
+        # Тело ответа в текст ошибки не попадает: HTML-страница прокси сломала бы разметку логов
+        super().__init__(f"{path} returned {status}")
+        self.path = path
+        self.status = status
+        self.body = body
@@ -0,0 +1,31 @@
+import asyncio
+import time as _time
+
+class Clock:
+    def __init__(self):
+        self.loop = None
+        self.offset = 0.0
+
+    def install(self, loop: asyncio.AbstractEventLoop, epoch: float | None = None) -> None:
+        # Время берётся из loop.time(): на цикле с виртуальным временем оно тоже становится виртуальным
+        self.loop = loop
+        self.offset = (epoch if epoch is not None else _time.time()) - loop.time()
+
+    def uninstall(self) -> None:
+        self.loop = None
+        self.offset = 0.0
+
+    def time(self) -> float:
+        if self.loop is None:
+            return _time.time()
+        return self.loop.time() + self.offset
+
+    def monotonic(self) -> float:
+        if self.loop is None:
+            return _time.monotonic()
+        return self.loop.time()
+
+    async def sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+clock = Clock()
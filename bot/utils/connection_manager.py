@@ -1,8 +1,29 @@
+import asyncio
+import aiohttp
+
 from functools import wraps
+from aiohttp_proxy import ProxyConnector
+from better_proxy import Proxy
+
+from bot.config import settings
+
+def get_proxy_address(proxy: str | None) -> str:
+    if not proxy:
+        return 'direct'
+    try:
+        proxy = Proxy.from_str(proxy)
+    except ValueError:
+        return 'invalid'
+    # Без логина и пароля, чтобы не публиковать их в логах и метриках
+    return f"{proxy.host}:{proxy.port}"
 
 class ConnectionManager:
     def __init__(self):
         self.connections = set()
+        self.sessions = {}
+        # Метка прокси для метрик считается один раз при создании сессии, а не на каждый запрос
+        self.labels = {}
+        self.trace_configs = []
 
     def add(self, connection):
         self.connections.add(connection)
@@ -10,17 +31,43 @@ class ConnectionManager:
     def remove(self, connection):
         self.connections.discard(connection)
 
+    def get_session(self, proxy: str | None = None) -> aiohttp.ClientSession:
+        # Одна сессия (и один пул keep-alive соединений) на каждый прокси
+        key = proxy or ''
+        session = self.sessions.get(key)
+
+        if session is None or session.closed:
+            if session is not None:
+                self.labels.pop(id(session), None)
+            connector_kwargs = dict(
+                limit_per_host=settings.CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=settings.CONNECTION_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            connector = (ProxyConnector.from_url(proxy, **connector_kwargs) if proxy
+                         else aiohttp.TCPConnector(**connector_kwargs))
+            session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar(),
+                                            trace_configs=self.trace_configs or None)
+            self.sessions[key] = session
+            self.labels[id(session)] = get_proxy_address(proxy)
+
+        return session
+
+    async def close_connection(self, connection) -> None:
+        if hasattr(connection, 'close') and callable(connection.close):
+            try:
+                await connection.close()
+            except Exception as e:
+                # Используем print вместо logger
+                print(f"Error closing connection: {e}")
+
     async def close_all(self):
-        for connection in self.connections:
-            if hasattr(connection, 'close') and callable(connection.close):
-                try:
-                    await connection.close()
-                except Exception as e:
-                    # Используем print вместо logger
-                    print(f"Error closing connection: {e}")
-
-        closed_count = len(self.connections)
-        self.connections.clear()
+        # Забираем копии: пока идёт закрытие, в наборы могут добавляться новые соединения
+        connections, self.connections = list(self.connections), set()
+        sessions, self.sessions = list(self.sessions.values()), {}
+        self.labels.clear()
+
+        await asyncio.gather(*(self.close_connection(connection) for connection in connections + sessions))
 
 connection_manager = ConnectionManager()
 
@@ -0,0 +1,49 @@
+import asyncio
+
+from bot.config import settings
+from bot.utils import logger
+
+LOOP_BACKENDS = ('asyncio', 'uvloop')
+
+def get_loop_factory(backend: str | None = None):
+    backend = (backend or settings.LOOP_BACKEND).lower()
+
+    if backend == 'uvloop':
+        try:
+            import uvloop
+        except ImportError:
+            # uvloop нет под Windows и он не входит в requirements.txt
+            logger.warning("uvloop is not installed, falling back to the asyncio event loop")
+            return None
+        return uvloop.new_event_loop
+
+    if backend != 'asyncio':
+        logger.warning(f"Unknown LOOP_BACKEND '{backend}', using the asyncio event loop")
+    return None
+
+def get_loop_name() -> str:
+    loop = asyncio.get_running_loop()
+    return 'uvloop' if type(loop).__module__.startswith('uvloop') else 'asyncio'
+
+class LoopFactoryPolicy(asyncio.DefaultEventLoopPolicy):
+    def __init__(self, loop_factory):
+        super().__init__()
+        self.loop_factory = loop_factory
+
+    def new_event_loop(self):
+        return self.loop_factory()
+
+def run(main, backend: str | None = None):
+    return run_with_factory(main, get_loop_factory(backend))
+
+def run_with_factory(main, loop_factory=None):
+    if loop_factory is None:
+        return asyncio.run(main)
+
+    if hasattr(asyncio, 'Runner'):
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            return runner.run(main)
+
+    # Python 3.10: asyncio.Runner ещё нет, подставляем фабрику через политику
+    asyncio.set_event_loop_policy(LoopFactoryPolicy(loop_factory))
+    return asyncio.run(main)
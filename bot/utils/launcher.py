@@ -1,24 +1,18 @@
-import os
-import glob
 import asyncio
 import argparse
-import json
 import traceback
 
-from pyrogram import Client
 from bot.config import settings
 from bot.utils import logger
-from bot.core.tapper import run_tapper
-from bot.core.registrator import register_sessions
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
-from rich.markdown import Markdown
-from bot.utils.banner import banner
-from bot.utils.documentation import get_documentation
-global tg_clients
+from bot.utils.clock import clock
+from bot.utils.session_index import session_index
+from bot.utils.preflight import preflight
+from bot.core.scheduler import Scheduler
+from bot.utils.supervisor import Supervisor
 
 async def smooth_progress(description, total_steps=100, duration=5):
+    from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
+
     with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -29,12 +23,15 @@ async def smooth_progress(description, total_steps=100, duration=5):
         task = progress.add_task(description, total=total_steps)
 
         for _ in range(total_steps):
-            await asyncio.sleep(duration / total_steps)
+            await clock.sleep(duration / total_steps)
             progress.update(task, advance=1)
 
     print()
 
 def display_menu(choices, session_count, proxy_count):
+    from rich.console import Console
+    from rich.panel import Panel
+
     console = Console()
 
     menu_text = "\n".join([f"[red][{i}][/red] {choice}" for i, choice in enumerate(choices, 1)])
@@ -64,30 +61,17 @@ def display_menu(choices, session_count, proxy_count):
 
 
 def get_session_names() -> list[str]:
-    session_names = sorted(glob.glob("sessions/*.session"))
-    session_names = [
-        os.path.splitext(os.path.basename(file))[0] for file in session_names
-    ]
-
-    return session_names
+    return session_index.load().session_names
 
 
 def get_proxies() -> dict:
-    try:
-        with open('bot/config/proxies/session_proxy.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("session_proxy.json file not found")
-        return {}
-    except json.JSONDecodeError:
-        logger.error("Error decoding session_proxy.json")
-        return {}
-
+    return session_index.load().proxies
 
-async def get_tg_clients() -> list[Client]:
-    global tg_clients
 
-    session_names = get_session_names()
+def get_run_session_names(session_names: list[str] | None = None) -> list[str]:
+    # Клиенты Telegram создаёт tg_manager, когда сессии нужен логин
+    if session_names is None:
+        session_names = get_session_names()
 
     if not session_names:
         raise FileNotFoundError("Not found session files")
@@ -95,23 +79,26 @@ async def get_tg_clients() -> list[Client]:
     if not settings.API_ID or not settings.API_HASH:
         raise ValueError("API_ID and API_HASH not found in the .env file.")
 
-    proxies = get_proxies() if settings.USE_PROXY else {}
+    return session_names
+
 
-    tg_clients = [
-        Client(
-            name=session_name,
-            api_id=settings.API_ID,
-            api_hash=settings.API_HASH,
-            workdir="sessions/",
-            plugins=dict(root="bot/plugins"),
-            proxy=proxies.get(session_name)
-        )
-        for session_name in session_names
-    ]
+async def get_checked_session_names(session_names: list[str] | None = None) -> list[str]:
+    session_names = get_run_session_names(session_names=session_names)
+    if not settings.PREFLIGHT_ENABLED:
+        return session_names
 
-    return tg_clients
+    # Невалидные сессии отсеиваются сразу, а не после RANDOM_DELAY_IN_RUN в get_tg_web_data
+    session_names = await preflight(session_names)
+    if not session_names:
+        raise FileNotFoundError("No valid session files")
+    return session_names
 
 def display_documentation(language='ru'):
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.markdown import Markdown
+    from bot.utils.documentation import get_documentation
+
     console = Console()
 
     instructions = get_documentation(language)
@@ -121,8 +108,12 @@ def display_documentation(language='ru'):
     console.print(Panel(md, title=title, border_style="green", expand=False))
 
 async def process() -> None:
+    from rich.console import Console
+    from bot.core.registrator import register_sessions
+
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes")
 
     args = parser.parse_args()
     action = args.action
@@ -139,6 +130,7 @@ async def process() -> None:
                 "Exit"
             ]
 
+            session_index.load(force=True)
             display_menu(choices, session_count=len(get_session_names()), proxy_count=len(get_proxies()))
 
             choice = console.input("[bold yellow]Select an action: [/bold yellow]")
@@ -152,9 +144,12 @@ async def process() -> None:
 
         if action == 1:
             await smooth_progress("Starting the bot...", total_steps=100, duration=2)
-            tg_clients = await get_tg_clients()
             try:
-                await run_tasks(tg_clients=tg_clients)
+                session_names = await get_checked_session_names()
+                if args.workers > 1:
+                    await Supervisor(workers=args.workers, session_names=session_names).run()
+                else:
+                    await run_tasks(session_names=session_names)
             except Exception as e:
                 logger.error(f"Error running tasks: {e}")
             finally:
@@ -195,21 +190,17 @@ async def process() -> None:
             action = None
 
 
-async def run_tasks(tg_clients: list[Client]):
+async def run_tasks(session_names: list[str]):
+    from rich.console import Console
+    from rich.panel import Panel
+    from bot.utils.banner import banner
+
     console = Console()
-    proxies = get_proxies() if settings.USE_PROXY else()
-    tasks = [
-        asyncio.create_task(
-            run_tapper(
-                tg_client=tg_client,
-                proxy=proxies.get(tg_client.name) if settings.USE_PROXY else None
-            )
-        )
-        for tg_client in tg_clients
-    ]
+    proxies = get_proxies() if settings.USE_PROXY else {}
+    scheduler = Scheduler()
 
     try:
-        await asyncio.gather(*tasks)
+        await scheduler.run(session_names=session_names, proxies=proxies)
     except asyncio.CancelledError:
         console.clear()
     except Exception as e:
@@ -219,3 +210,38 @@ async def run_tasks(tg_clients: list[Client]):
     finally:
         logger.info("All tasks completed or stopped. Returning to menu.")
         banner()
+
+
+def get_run_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py run", description="Run sessions without the interactive menu")
+    parser.add_argument("-s", "--sessions", nargs="+", help="Session names to run (default: all sessions)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes")
+    return parser
+
+
+async def run_headless(argv: list[str]) -> None:
+    args = get_run_parser().parse_args(argv)
+
+    session_names = get_session_names()
+    if args.sessions:
+        unknown = set(args.sessions) - set(session_names)
+        for session_name in sorted(unknown):
+            logger.error(f"{session_name} | Session file not found")
+        session_names = [name for name in session_names if name in args.sessions]
+
+    if not session_names:
+        logger.error("Not found session files")
+        return
+
+    try:
+        session_names = await get_checked_session_names(session_names=session_names)
+    except (FileNotFoundError, ValueError) as error:
+        logger.error(str(error))
+        return
+
+    if args.workers > 1:
+        await Supervisor(workers=args.workers, session_names=session_names).run()
+        return
+
+    proxies = get_proxies() if settings.USE_PROXY else {}
+    await Scheduler().run(session_names=session_names, proxies=proxies)
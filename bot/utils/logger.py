@@ -1,17 +1,106 @@
+import os
 import sys
+import json
+
+from collections import OrderedDict
 from loguru import logger
 
+from bot.config import settings
+
+class JsonSink:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __call__(self, message):
+        record = message.record
+        data = {
+            'time': record['time'].isoformat(),
+            'level': record['level'].name,
+            'message': record['message'],
+            **record['extra']
+        }
+        if record['exception']:
+            data['exception'] = repr(record['exception'].value)
+
+        self.stream.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+class SessionFileSink:
+    def __init__(self, directory: str, max_bytes: int, backups: int = 3, max_open_files: int = 64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_open_files = max_open_files
+        # Открытых файлов не больше max_open_files, независимо от числа сессий
+        self.files = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, session_name: str):
+        file = self.files.pop(session_name, None)
+        if file is None:
+            file = open(os.path.join(self.directory, f"{session_name}.log"), 'a', encoding='utf-8')
+            if len(self.files) >= self.max_open_files:
+                _, oldest = self.files.popitem(last=False)
+                oldest.close()
+        self.files[session_name] = file
+        return file
+
+    def rotate(self, session_name: str) -> None:
+        self.files.pop(session_name).close()
+        path = os.path.join(self.directory, f"{session_name}.log")
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+    def __call__(self, message):
+        session_name = message.record['extra'].get('session_name')
+        if not session_name:
+            return
+
+        file = self.open(session_name)
+        file.write(message)
+        file.flush()
+
+        if file.tell() >= self.max_bytes:
+            self.rotate(session_name)
+
+    def stop(self) -> None:
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
+
 logger.remove()
 
-logger.add(
-    sink=sys.stdout,
-    format=(
-        "<green><b>[Agent301]</b></green> "
-        "| <white>{time:HH:mm:ss}</white> "
-        "| <level>{level: <8}</level> "
-        "| <white><b>{message}</b></white>"
-    ),
-    colorize=True
-)
-
-logger = logger.opt(colors=True)
\ No newline at end of file
+if settings.LOG_FORMAT == 'json':
+    logger.add(
+        sink=JsonSink(sys.stdout),
+        format="{message}",
+        level=settings.LOG_LEVEL,
+        colorize=False,
+        enqueue=settings.LOG_ENQUEUE
+    )
+else:
+    logger.add(
+        sink=sys.stdout,
+        format=(
+            "<green><b>[Agent301]</b></green> "
+            "| <white>{time:HH:mm:ss}</white> "
+            "| <level>{level: <8}</level> "
+            "| <white><b>{message}</b></white>"
+        ),
+        level=settings.LOG_LEVEL,
+        colorize=True,
+        enqueue=settings.LOG_ENQUEUE
+    )
+
+if settings.LOG_SESSION_FILES:
+    logger.add(
+        sink=SessionFileSink(settings.LOG_DIR, max_bytes=settings.LOG_ROTATION_MB * 1024 * 1024),
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
+        level=settings.LOG_LEVEL,
+        colorize=False,
+        enqueue=settings.LOG_ENQUEUE
+    )
+
+logger = logger.opt(colors=True)
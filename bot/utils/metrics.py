@@ -0,0 +1,202 @@
+import asyncio
+import aiohttp
+
+from time import perf_counter
+from aiohttp import web
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.connection_manager import connection_manager
+from bot.utils.proxy_health import proxy_health
+from bot.utils.tg_manager import tg_manager
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+registry = []
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labelnames: tuple, labelvalues: tuple, extra: dict | None = None) -> str:
+    labels = dict(zip(labelnames, labelvalues), **(extra or {}))
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+class Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.append(self)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        self.values[labelvalues] = self.values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{format_labels(self.labelnames, labelvalues)} {value}"
+            for labelvalues, value in self.values.items()
+        ]
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+        self.function = function
+
+    def set(self, value: float, *labelvalues) -> None:
+        self.values[labelvalues] = value
+
+    def render(self) -> list[str]:
+        if self.function is not None:
+            self.values[()] = self.function()
+        return self.header() + [
+            f"{self.name}{format_labels(self.labelnames, labelvalues)} {value}"
+            for labelvalues, value in self.values.items()
+        ]
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value: float, *labelvalues) -> None:
+        state = self.values.setdefault(labelvalues, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state['buckets'][i] += 1
+        state['sum'] += value
+        state['count'] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labelvalues, state in self.values.items():
+            for bound, count in zip(self.buckets, state['buckets']):
+                labels = format_labels(self.labelnames, labelvalues, {'le': bound})
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = format_labels(self.labelnames, labelvalues, {'le': '+Inf'})
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labelvalues)} {state['sum']}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labelvalues)} {state['count']}")
+        return lines
+
+def count_open_connections() -> int:
+    count = 0
+    for session in list(connection_manager.sessions.values()):
+        connector = session.connector
+        if connector is None or connector.closed:
+            continue
+        # В aiohttp нет публичного счётчика соединений: занятые + простаивающие в пуле
+        count += len(connector._acquired) + sum(len(conns) for conns in connector._conns.values())
+    return count
+
+api_requests = Counter('agent301_api_requests_total', 'API requests by endpoint, proxy and status',
+                       ('endpoint', 'proxy', 'status'))
+api_latency = Histogram('agent301_api_request_seconds', 'API request latency by endpoint and proxy',
+                        ('endpoint', 'proxy'))
+api_exceptions = Counter('agent301_api_exceptions_total', 'API request exceptions by endpoint and class',
+                         ('endpoint', 'proxy', 'exception'))
+api_retries = Counter('agent301_api_retries_total', 'API requests retried by endpoint and error class',
+                      ('endpoint', 'exception'))
+cycle_errors = Counter('agent301_cycle_errors_total', 'Session cycles aborted by error class', ('exception',))
+cycles = Counter('agent301_cycles_total', 'Completed session cycles')
+sessions_active = Gauge('agent301_sessions_active', 'Sessions currently running a cycle')
+sessions_sleeping = Gauge('agent301_sessions_sleeping', 'Sessions waiting for their next wake-up')
+open_connections = Gauge('agent301_open_connections', 'Open pooled HTTP connections', function=count_open_connections)
+rate_limit_wait = Counter('agent301_rate_limit_wait_seconds_total', 'Time requests waited for the rate limiter',
+                          ('endpoint',))
+proxies_open = Gauge('agent301_proxies_circuit_open', 'Proxies whose circuit breaker is open',
+                     function=lambda: sum(state.opened_at is not None for state in proxy_health.proxies.values()))
+phase_latency = Histogram('agent301_phase_seconds', 'Duration of session cycle phases including pacing sleeps',
+                          ('phase',), buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+slow_callbacks = Counter('agent301_slow_callbacks_total', 'Event-loop callbacks slower than SLOW_CALLBACK_THRESHOLD')
+server_clock_offset = Gauge('agent301_server_clock_offset_seconds', 'Estimated API server clock minus local clock')
+tg_clients = Gauge('agent301_tg_clients', 'Telegram clients kept in the client cache',
+                   function=lambda: len(tg_manager.clients))
+loop_lag = Gauge('agent301_event_loop_lag_seconds', 'Delay of the last event-loop lag probe')
+
+def get_proxy_label(session: aiohttp.ClientSession) -> str:
+    return connection_manager.labels.get(id(session), 'unknown')
+
+def get_endpoint(context, params) -> str:
+    # Agent301Client передаёт путь так же, как в rate_limit_wait и api_retries: "getMe", а не "/getMe"
+    if context.trace_request_ctx:
+        return context.trace_request_ctx['endpoint']
+    return params.url.path
+
+async def on_request_start(session, context, params):
+    context.start = perf_counter()
+
+async def on_request_end(session, context, params):
+    endpoint, proxy = get_endpoint(context, params), get_proxy_label(session)
+    api_requests.inc(endpoint, proxy, params.response.status)
+    api_latency.observe(perf_counter() - context.start, endpoint, proxy)
+
+async def on_request_exception(session, context, params):
+    endpoint, proxy = get_endpoint(context, params), get_proxy_label(session)
+    api_exceptions.inc(endpoint, proxy, type(params.exception).__name__)
+    api_latency.observe(perf_counter() - context.start, endpoint, proxy)
+
+trace_config = aiohttp.TraceConfig()
+trace_config.on_request_start.append(on_request_start)
+trace_config.on_request_end.append(on_request_end)
+trace_config.on_request_exception.append(on_request_exception)
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+async def monitor_loop_lag(interval: float = 1.0) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - started - interval, 0.0)
+        loop_lag.set(lag)
+        if settings.PROFILING_ENABLED and lag >= settings.LOOP_LAG_THRESHOLD:
+            logger.warning(f"Profiler | Event loop lagged by {lag:.3f}s")
+
+async def start_metrics_server(port: int | None = None) -> web.AppRunner:
+    if trace_config not in connection_manager.trace_configs:
+        connection_manager.trace_configs.append(trace_config)
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handler)
+
+    lag_monitor = asyncio.create_task(monitor_loop_lag())
+
+    async def stop_lag_monitor(app):
+        lag_monitor.cancel()
+
+    app.on_cleanup.append(stop_lag_monitor)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = port or settings.METRICS_PORT
+    await web.TCPSite(runner, settings.METRICS_HOST, port).start()
+    logger.info(f"Metrics are available at http://{settings.METRICS_HOST}:{port}/metrics")
+
+    return runner
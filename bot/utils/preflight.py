@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+
+from concurrent.futures import ProcessPoolExecutor
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.session_storage import SESSIONS_DIR, session_store, open_session_file, read_session_row
+from bot.utils.state_store import state_store
+
+# Файлы проверяются пачками, чтобы передача в дочерний процесс стоила меньше самой проверки
+CHUNK_SIZE = 64
+
+def validate_session(session: dict) -> str | None:
+    auth_key = session.get('auth_key')
+    if not auth_key or len(auth_key) != 256:
+        return "no auth key"
+    if session.get('dc_id') not in (1, 2, 3, 4, 5):
+        return f"invalid dc_id {session.get('dc_id')}"
+    if not session.get('user_id'):
+        return "not signed in"
+    return None
+
+def check_session_file(path: str) -> str | None:
+    try:
+        connection = open_session_file(path)
+    except sqlite3.Error as error:
+        return f"cannot open: {error}"
+
+    try:
+        session = read_session_row(connection)
+    except sqlite3.Error as error:
+        return f"not a Pyrogram session: {error}"
+    except ValueError as error:
+        return str(error)
+    finally:
+        connection.close()
+    return validate_session(session)
+
+def check_session_files(paths: list[str]) -> list[str | None]:
+    return [check_session_file(path) for path in paths]
+
+def get_session_mtime(session_name: str) -> float | None:
+    try:
+        return os.stat(os.path.join(SESSIONS_DIR, f"{session_name}.session")).st_mtime
+    except OSError:
+        return None
+
+async def check_files(session_names: list[str]) -> list[str | None]:
+    paths = [os.path.join(SESSIONS_DIR, f"{session_name}.session") for session_name in session_names]
+    if len(paths) <= CHUNK_SIZE:
+        # Ради одной пачки пул процессов не поднимаем
+        return await asyncio.to_thread(check_session_files, paths)
+
+    loop = asyncio.get_running_loop()
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+    workers = min(settings.PREFLIGHT_WORKERS or os.cpu_count() or 1, len(chunks))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        results = await asyncio.gather(*(loop.run_in_executor(pool, check_session_files, chunk) for chunk in chunks))
+    return [reason for chunk in results for reason in chunk]
+
+async def check_shared(session_names: list[str]) -> list[str | None]:
+    reasons = []
+    for session_name in session_names:
+        session = await session_store.load(session_name)
+        reasons.append(validate_session(session) if session else "not found in the shared store")
+    return reasons
+
+async def preflight(session_names: list[str]) -> list[str]:
+    if settings.SESSION_STORAGE == 'shared':
+        # Общая база уже проиндексирована, проверка идёт прямо по ней и не кэшируется
+        verdicts = dict(zip(session_names, await check_shared(session_names)))
+        cached = 0
+    else:
+        saved = await state_store.get_all('preflight')
+        mtimes = {session_name: get_session_mtime(session_name) for session_name in session_names}
+        verdicts = {}
+        for session_name, mtime in mtimes.items():
+            verdict = saved.get(session_name)
+            # Файл не менялся с прошлой проверки — берём сохранённый вердикт
+            if verdict and mtime is not None and verdict.get('mtime') == mtime:
+                verdicts[session_name] = verdict.get('reason')
+
+        cached = len(verdicts)
+        unchecked = [session_name for session_name in session_names if session_name not in verdicts]
+        if unchecked:
+            reasons = await check_files(unchecked)
+            verdicts.update(zip(unchecked, reasons))
+            await state_store.set_many([
+                (session_name, 'preflight', {'mtime': mtimes[session_name], 'reason': reason})
+                for session_name, reason in zip(unchecked, reasons)
+            ])
+
+    valid = [session_name for session_name in session_names if verdicts.get(session_name) is None]
+    for session_name in session_names:
+        if verdicts.get(session_name) is not None:
+            logger.bind(session_name=session_name).error(
+                f"{session_name} | Invalid session: {verdicts[session_name]}. Skipping it")
+
+    logger.info(f"Pre-flight | <green>{len(valid)}</green> valid, <red>{len(session_names) - len(valid)}</red> invalid "
+                f"sessions ({cached} verdicts reused)")
+    return valid
+
+async def mark_invalid(session_name: str, reason: str) -> None:
+    # Сессия, отклонённая Telegram, пропускается при следующих запусках, пока файл не изменится
+    if settings.SESSION_STORAGE != 'shared':
+        await state_store.set(session_name, 'preflight', {'mtime': get_session_mtime(session_name), 'reason': reason})
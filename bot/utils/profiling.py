@@ -0,0 +1,122 @@
+import asyncio
+import sys
+import threading
+
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter
+
+from bot.config import settings
+from bot.utils import logger, metrics
+
+def describe_handle(handle: asyncio.Handle) -> str:
+    callback = handle._callback
+    owner = getattr(callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return f"task {owner.get_name()} ({getattr(coro, '__qualname__', coro)})"
+    return getattr(callback, '__qualname__', repr(callback))
+
+@contextmanager
+def phase(name: str, session_name: str = ''):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        duration = perf_counter() - started
+        metrics.phase_latency.observe(duration, name)
+        if settings.PROFILING_ENABLED:
+            logger.bind(session_name=session_name).debug(f"{session_name} | Phase {name} took {duration:.3f}s")
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float, report_interval: float, top: int = 10):
+        super().__init__(name="agent301-stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.report_interval = report_interval
+        self.top = top
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        last_report = perf_counter()
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                # Считаем только верхний кадр: это и есть код, который сейчас занимает цикл событий
+                code = frame.f_code
+                self.samples[f"{code.co_filename}:{frame.f_lineno} {code.co_name}"] += 1
+
+            if perf_counter() - last_report >= self.report_interval:
+                self.report()
+                last_report = perf_counter()
+
+    def report(self) -> None:
+        total = sum(self.samples.values())
+        if not total:
+            return
+
+        lines = [f"{count * 100 / total:5.1f}%  {location}" for location, count in self.samples.most_common(self.top)]
+        logger.info(f"Profiler | Hottest lines of the event-loop thread ({total} samples):\n" + "\n".join(lines))
+        self.samples.clear()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+class Profiler:
+    def __init__(self):
+        self.original_run = None
+        self.lag_monitor = None
+        self.sampler = None
+
+    def install_slow_callback_detector(self, threshold: float) -> None:
+        # Оборачиваем Handle._run, как это делает режим отладки asyncio, но без остальных его накладных расходов
+        original_run = self.original_run = asyncio.Handle._run
+
+        def _run(handle):
+            started = perf_counter()
+            original_run(handle)
+            duration = perf_counter() - started
+            if duration >= threshold:
+                metrics.slow_callbacks.inc()
+                logger.warning(f"Profiler | Slow callback took {duration:.3f}s: {describe_handle(handle)}")
+
+        asyncio.Handle._run = _run
+
+    def start(self) -> None:
+        if self.original_run is not None or self.lag_monitor is not None:
+            return
+
+        if isinstance(asyncio.get_running_loop(), asyncio.BaseEventLoop):
+            self.install_slow_callback_detector(settings.SLOW_CALLBACK_THRESHOLD)
+        else:
+            logger.warning("Profiler | Slow callback detection needs LOOP_BACKEND=asyncio, skipping it")
+
+        # При METRICS_ENABLED задержку цикла уже меряет сервер метрик
+        if not settings.METRICS_ENABLED:
+            self.lag_monitor = asyncio.create_task(metrics.monitor_loop_lag())
+
+        if settings.PROFILING_STACK_INTERVAL > 0:
+            self.sampler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL,
+                                        settings.PROFILING_STACK_INTERVAL)
+            self.sampler.start()
+
+        logger.info(f"Profiler | Enabled, slow callback threshold {settings.SLOW_CALLBACK_THRESHOLD}s, "
+                    f"loop lag threshold {settings.LOOP_LAG_THRESHOLD}s")
+
+    def stop(self) -> None:
+        if self.original_run is not None:
+            asyncio.Handle._run = self.original_run
+            self.original_run = None
+
+        if self.lag_monitor is not None:
+            self.lag_monitor.cancel()
+            self.lag_monitor = None
+
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler.join()
+            self.sampler.report()
+            self.sampler = None
+
+profiler = Profiler()
@@ -0,0 +1,111 @@
+import asyncio
+import aiohttp
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.connection_manager import connection_manager, get_proxy_address
+from bot.utils.clock import clock
+
+class ProxyState:
+    __slots__ = ('healthy', 'failures', 'checked_at', 'opened_at', 'probe')
+
+    def __init__(self):
+        self.healthy = False
+        self.failures = 0
+        self.checked_at = None
+        self.opened_at = None
+        self.probe = None
+
+class ProxyHealth:
+    def __init__(self):
+        self.proxies = {}
+
+    def get_state(self, proxy: str) -> ProxyState:
+        state = self.proxies.get(proxy)
+        if state is None:
+            state = self.proxies[proxy] = ProxyState()
+        return state
+
+    def cooldown_left(self, proxy: str | None) -> float:
+        state = self.proxies.get(proxy) if proxy else None
+        if state is None or state.opened_at is None:
+            return 0.0
+        return max(settings.PROXY_BREAKER_COOLDOWN - (clock.monotonic() - state.opened_at), 0.0)
+
+    def retry_after(self, proxy: str | None) -> float:
+        state = self.proxies.get(proxy) if proxy else None
+        if state is None:
+            return 0.0
+        if state.opened_at is not None:
+            return self.cooldown_left(proxy)
+        if state.checked_at is None:
+            return 0.0
+        return max(settings.PROXY_CHECK_TTL - (clock.monotonic() - state.checked_at), 0.0)
+
+    def record_success(self, proxy: str | None) -> None:
+        if not proxy:
+            return
+
+        state = self.get_state(proxy)
+        if state.opened_at is not None:
+            logger.info(f"Proxy {get_proxy_address(proxy)} | Circuit closed, proxy is healthy again")
+        state.healthy = True
+        state.failures = 0
+        state.opened_at = None
+        state.checked_at = clock.monotonic()
+
+    def record_failure(self, proxy: str | None, error: BaseException | None = None) -> None:
+        if not proxy:
+            return
+
+        state = self.get_state(proxy)
+        state.failures += 1
+
+        if state.opened_at is not None:
+            # Пробный запрос в полуоткрытом состоянии не прошёл — снова ждём полный cooldown
+            state.opened_at = clock.monotonic()
+        elif state.failures >= settings.PROXY_FAILURE_THRESHOLD:
+            state.opened_at = clock.monotonic()
+            logger.warning(f"Proxy {get_proxy_address(proxy)} | Circuit opened after {state.failures} "
+                           f"consecutive failures ({error}). Sessions skip it for {settings.PROXY_BREAKER_COOLDOWN}s")
+
+    async def probe(self, proxy: str) -> bool:
+        http_client = connection_manager.get_session(proxy)
+        try:
+            async with http_client.get(settings.PROXY_CHECK_URL,
+                                       timeout=aiohttp.ClientTimeout(total=settings.PROXY_CHECK_TIMEOUT)) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except Exception as error:
+            logger.error(f"Proxy {get_proxy_address(proxy)} | Proxy error: {error}")
+            state = self.get_state(proxy)
+            state.healthy = False
+            state.checked_at = clock.monotonic()
+            self.record_failure(proxy, error)
+            return False
+
+        data = data if isinstance(data, dict) else {}
+        logger.info(
+            f"Proxy {get_proxy_address(proxy)} | Check proxy! Country: <cyan>{data.get('country')}</cyan> | "
+            f"City: <light-yellow>{data.get('city')}</light-yellow> | Proxy IP: {data.get('ip')}")
+        self.record_success(proxy)
+        return True
+
+    async def check(self, proxy: str) -> bool:
+        state = self.get_state(proxy)
+
+        if state.probe is None:
+            if state.opened_at is not None:
+                # Полуоткрытое состояние: после cooldown пропускаем один пробный запрос
+                if self.cooldown_left(proxy) > 0:
+                    return False
+            elif state.checked_at is not None and clock.monotonic() - state.checked_at < settings.PROXY_CHECK_TTL:
+                return state.healthy
+
+            # Один пробный запрос на прокси, остальные сессии ждут его результат
+            state.probe = asyncio.ensure_future(self.probe(proxy))
+            state.probe.add_done_callback(lambda _: setattr(state, 'probe', None))
+
+        return await asyncio.shield(state.probe)
+
+proxy_health = ProxyHealth()
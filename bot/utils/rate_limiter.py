@@ -0,0 +1,50 @@
+from bot.config import settings
+from bot.utils import metrics
+from bot.utils.clock import clock
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = clock.monotonic()
+
+    def reserve(self) -> float:
+        now = clock.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Уходим в минус: каждая следующая заявка встаёт в очередь за предыдущей, блокировка не нужна
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+class RateLimiter:
+    def __init__(self):
+        self.buckets = {}
+        # В режиме --workers лимиты делятся между процессами
+        self.scale = 1.0
+
+    def get_bucket(self, key: tuple, rate: float) -> TokenBucket | None:
+        if rate <= 0:
+            return None
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(rate * self.scale, settings.RATE_LIMIT_BURST)
+        return bucket
+
+    def reserve(self, endpoint: str, proxy: str | None) -> float:
+        delay = 0.0
+        endpoint_rate = settings.RATE_LIMITS.get(endpoint, settings.RATE_LIMIT_PER_ENDPOINT)
+        for bucket in (self.get_bucket(('endpoint', endpoint), endpoint_rate),
+                       self.get_bucket(('proxy', proxy or ''), settings.RATE_LIMIT_PER_PROXY)):
+            if bucket is not None:
+                delay = max(delay, bucket.reserve())
+        return delay
+
+    async def acquire(self, endpoint: str, proxy: str | None) -> None:
+        delay = self.reserve(endpoint, proxy)
+        if delay > 0:
+            metrics.rate_limit_wait.inc(endpoint, amount=delay)
+            await clock.sleep(delay)
+
+rate_limiter = RateLimiter()
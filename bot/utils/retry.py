@@ -0,0 +1,72 @@
+import asyncio
+import random
+import aiohttp
+
+from bot.config import settings
+from bot.exceptions import ApiError
+from bot.utils import logger, metrics
+from bot.utils.clock import clock
+
+RETRYABLE_ERRORS = (
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    asyncio.TimeoutError,
+)
+
+def is_retryable(error: BaseException, idempotent: bool = True) -> bool:
+    if not idempotent:
+        # Запрос, меняющий состояние, мог дойти до сервера: повторяем, только если он точно не ушёл или сервер попросил подождать
+        return (isinstance(error, aiohttp.ClientConnectorError)
+                or isinstance(error, ApiError) and error.status == 429)
+    if isinstance(error, ApiError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, RETRYABLE_ERRORS)
+
+def backoff(attempt: int, base_delay: float, max_delay: float) -> float:
+    # Full jitter: сессии, упавшие одновременно, не возвращаются одновременно
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def cycle_delay(failures: int) -> int:
+    ceiling = min(settings.CYCLE_RETRY_MAX_DELAY, settings.CYCLE_RETRY_BASE_DELAY * 2 ** failures)
+    # Половина задержки гарантирована, чтобы упавший цикл не повторялся сразу
+    return int(ceiling / 2 + random.uniform(0, ceiling / 2))
+
+class RetryPolicy:
+    def __init__(self, attempts: int | None = None, base_delay: float | None = None,
+                 max_delay: float | None = None, deadline: float | None = None,
+                 budgets: dict[str, int] | None = None):
+        self.attempts = attempts if attempts is not None else settings.RETRY_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else settings.RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else settings.RETRY_MAX_DELAY
+        self.deadline = deadline if deadline is not None else settings.RETRY_DEADLINE
+        self.budgets = budgets if budgets is not None else settings.RETRY_BUDGETS
+
+    async def call(self, func, *args, endpoint: str = '', session_name: str = '', idempotent: bool = True):
+        deadline = clock.monotonic() + self.deadline
+        spent = {}
+        attempt = 0
+
+        while True:
+            try:
+                return await func(*args)
+            except Exception as error:
+                if not is_retryable(error, idempotent):
+                    raise
+
+                error_class = type(error).__name__
+                spent[error_class] = spent.get(error_class, 0) + 1
+                attempt += 1
+                delay = backoff(attempt - 1, self.base_delay, self.max_delay)
+
+                if (attempt >= self.attempts
+                        or spent[error_class] > self.budgets.get(error_class, self.attempts)
+                        or clock.monotonic() + delay > deadline):
+                    raise
+
+                metrics.api_retries.inc(endpoint, error_class)
+                logger.bind(session_name=session_name).debug(
+                    "{} | {} failed with {}: {}. Retry {} in {:.1f}s",
+                    session_name, endpoint, error_class, error, attempt, delay)
+                await clock.sleep(delay)
+
+retry_policy = RetryPolicy()
@@ -0,0 +1,120 @@
+import os
+import json
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.state_store import state_store
+from bot.utils.session_storage import session_store, get_file_session_names
+
+USER_AGENTS_DIR = 'user_agents'
+PROXY_FILE_PATH = 'bot/config/proxies/session_proxy.json'
+
+# Служебные значения хранятся под пустым именем сессии
+GLOBAL_KEY = ''
+
+class SessionIndex:
+    def __init__(self):
+        self.session_names = []
+        self.proxies = {}
+        self.metadata = {}
+        self.loaded = False
+
+    def load(self, force: bool = False) -> 'SessionIndex':
+        if self.loaded and not force:
+            return self
+
+        self.session_names = self.load_session_names()
+        self.migrate_user_agents()
+        self.import_proxies()
+
+        self.metadata = state_store.get_all_sync('metadata')
+        self.proxies = {name: proxy for name, proxy in state_store.get_all_sync('proxy').items() if proxy}
+        self.loaded = True
+
+        return self
+
+    def load_session_names(self) -> list[str]:
+        if settings.SESSION_STORAGE == 'shared':
+            # Без обхода каталога sessions/: имена берутся из индекса общей базы
+            return session_store.get_session_names_sync()
+        return get_file_session_names()
+
+    def import_proxies(self) -> None:
+        try:
+            mtime = os.path.getmtime(PROXY_FILE_PATH)
+        except OSError:
+            if not state_store.get_all_sync('proxy'):
+                logger.error("session_proxy.json file not found")
+            return
+
+        # session_proxy.json остаётся редактируемым: изменения подхватываются по mtime
+        if state_store.get_sync(GLOBAL_KEY, 'proxy_file_mtime') == mtime:
+            return
+
+        try:
+            with open(PROXY_FILE_PATH, 'r') as f:
+                proxies = json.load(f)
+        except json.JSONDecodeError:
+            logger.error("Error decoding session_proxy.json")
+            return
+
+        # Прокси из регистратора в файл не попадают, поэтому сбрасываем только те, что раньше пришли из файла.
+        # До первого импорта с этим списком считаем, что из файла пришли все сохранённые прокси
+        imported = state_store.get_sync(GLOBAL_KEY, 'proxy_file_sessions')
+        if imported is None:
+            imported = list(state_store.get_all_sync('proxy'))
+        removed = [session_name for session_name in imported if session_name not in proxies]
+
+        state_store.set_many_sync(
+            [(session_name, 'proxy', proxy) for session_name, proxy in proxies.items()]
+            + [(session_name, 'proxy', '') for session_name in removed]
+            + [(GLOBAL_KEY, 'proxy_file_sessions', list(proxies)), (GLOBAL_KEY, 'proxy_file_mtime', mtime)]
+        )
+        if removed:
+            logger.info(f"Cleared proxies of {len(removed)} sessions removed from session_proxy.json")
+
+    def migrate_user_agents(self) -> None:
+        if state_store.get_sync(GLOBAL_KEY, 'user_agents_migrated') or not os.path.isdir(USER_AGENTS_DIR):
+            return
+
+        metadata = {}
+        with os.scandir(USER_AGENTS_DIR) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json'):
+                    continue
+
+                session_name = entry.name[:-len('.json')]
+                try:
+                    with open(entry.path, 'r') as f:
+                        data = json.load(f)
+                except json.JSONDecodeError:
+                    logger.warning(f"{session_name} | Invalid JSON in user agent file: {entry.name}")
+                    continue
+                except OSError as e:
+                    logger.error(f"{session_name} | Error reading user agent file {entry.name}: {e}")
+                    continue
+
+                if not isinstance(data, dict) or data.get('session_name') != session_name:
+                    logger.warning(f"{session_name} | Session name mismatch in file '{entry.name}'.")
+                    continue
+
+                metadata[session_name] = data
+
+        state_store.set_many_sync(
+            [(session_name, 'metadata', data) for session_name, data in metadata.items()]
+            + [(GLOBAL_KEY, 'user_agents_migrated', True)]
+        )
+        logger.info(f"Migrated {len(metadata)} user agent files to {settings.STATE_DB_PATH}")
+
+    def get_metadata(self, session_name: str) -> dict | None:
+        return self.metadata.get(session_name)
+
+    async def save_metadata(self, session_name: str, data: dict) -> None:
+        self.metadata[session_name] = data
+        await state_store.set(session_name, 'metadata', data)
+
+    def save_proxy(self, session_name: str, proxy: str) -> None:
+        self.proxies[session_name] = proxy
+        state_store.set_many_sync([(session_name, 'proxy', proxy)])
+
+session_index = SessionIndex()
@@ -0,0 +1,313 @@
+import argparse
+import os
+import sqlite3
+
+from pyrogram.storage import Storage
+from pyrogram.storage.sqlite_storage import SCHEMA, SQLiteStorage, get_input_peer
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.clock import clock
+from bot.utils.state_store import state_store
+
+SESSIONS_DIR = 'sessions'
+SESSION_FIELDS = ('dc_id', 'api_id', 'test_mode', 'auth_key', 'date', 'user_id', 'is_bot')
+PEER_FIELDS = ('id', 'access_hash', 'type', 'username', 'phone_number', 'last_update_on')
+PEER_LOOKUPS = ('id', 'username', 'phone_number')
+
+# Авторизации и кэши пиров всех сессий Pyrogram в одной базе вместо файла .session на аккаунт
+class SessionStore:
+    def __init__(self, store=state_store):
+        self.store = store
+        self.schema_connection = None
+
+    def _ensure_schema(self, connection: sqlite3.Connection) -> None:
+        if connection is self.schema_connection:
+            return
+
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tg_sessions ("
+                "session_name TEXT PRIMARY KEY, "
+                "dc_id INTEGER, api_id INTEGER, test_mode INTEGER, auth_key BLOB, "
+                "date INTEGER NOT NULL, user_id INTEGER, is_bot INTEGER)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tg_peers ("
+                "session_name TEXT NOT NULL, id INTEGER NOT NULL, access_hash INTEGER, type TEXT NOT NULL, "
+                "username TEXT, phone_number TEXT, last_update_on INTEGER NOT NULL, "
+                "PRIMARY KEY (session_name, id))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS tg_peers_username ON tg_peers (session_name, username)")
+            connection.execute("CREATE INDEX IF NOT EXISTS tg_peers_phone_number ON tg_peers (session_name, phone_number)")
+        self.schema_connection = connection
+
+    def _load(self, connection: sqlite3.Connection, session_name: str) -> dict | None:
+        self._ensure_schema(connection)
+        row = connection.execute(
+            f"SELECT {', '.join(SESSION_FIELDS)} FROM tg_sessions WHERE session_name = ?", (session_name,)
+        ).fetchone()
+        return dict(zip(SESSION_FIELDS, row)) if row else None
+
+    def _save(self, connection: sqlite3.Connection, session_name: str, session: dict, peers: list[tuple]) -> None:
+        self._ensure_schema(connection)
+        with connection:
+            connection.execute(
+                f"REPLACE INTO tg_sessions (session_name, {', '.join(SESSION_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_name, *(session[field] for field in SESSION_FIELDS))
+            )
+            if peers:
+                connection.executemany(
+                    f"REPLACE INTO tg_peers (session_name, {', '.join(PEER_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(session_name, *peer) for peer in peers]
+                )
+
+    def _get_peer(self, connection: sqlite3.Connection, session_name: str, column: str, value) -> tuple | None:
+        if column not in PEER_LOOKUPS:
+            raise ValueError(f"Unknown peer column: {column}")
+
+        self._ensure_schema(connection)
+        return connection.execute(
+            f"SELECT {', '.join(PEER_FIELDS)} FROM tg_peers WHERE session_name = ? AND {column} = ? "
+            "ORDER BY last_update_on DESC",
+            (session_name, value)
+        ).fetchone()
+
+    def _get_peers(self, connection: sqlite3.Connection, session_name: str) -> list[tuple]:
+        self._ensure_schema(connection)
+        return connection.execute(
+            f"SELECT {', '.join(PEER_FIELDS)} FROM tg_peers WHERE session_name = ?", (session_name,)
+        ).fetchall()
+
+    def _delete(self, connection: sqlite3.Connection, session_name: str) -> None:
+        self._ensure_schema(connection)
+        with connection:
+            connection.execute("DELETE FROM tg_sessions WHERE session_name = ?", (session_name,))
+            connection.execute("DELETE FROM tg_peers WHERE session_name = ?", (session_name,))
+
+    def _get_session_names(self, connection: sqlite3.Connection) -> list[str]:
+        self._ensure_schema(connection)
+        return [row[0] for row in connection.execute("SELECT session_name FROM tg_sessions ORDER BY session_name")]
+
+    async def load(self, session_name: str) -> dict | None:
+        return await self.store.call(self._load, session_name)
+
+    async def save(self, session_name: str, session: dict, peers: list[tuple] | None = None) -> None:
+        await self.store.call(self._save, session_name, session, peers or [])
+
+    async def get_peer(self, session_name: str, column: str, value) -> tuple | None:
+        return await self.store.call(self._get_peer, session_name, column, value)
+
+    async def delete(self, session_name: str) -> None:
+        await self.store.call(self._delete, session_name)
+
+    def get_session_names_sync(self) -> list[str]:
+        return self.store.call_sync(self._get_session_names)
+
+    def import_file(self, session_name: str, path: str) -> int:
+        session, peers = read_session_file(path)
+        self.store.call_sync(self._save, session_name, session, peers)
+        return len(peers)
+
+    def export_file(self, session_name: str, path: str) -> int:
+        session = self.store.call_sync(self._load, session_name)
+        if session is None:
+            raise KeyError(f"Session not found: {session_name}")
+
+        peers = self.store.call_sync(self._get_peers, session_name)
+        write_session_file(path, session, peers)
+        return len(peers)
+
+session_store = SessionStore()
+
+def open_session_file(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+def read_session_row(connection: sqlite3.Connection) -> dict:
+    cursor = connection.execute("SELECT * FROM sessions")
+    columns = [column[0] for column in cursor.description]
+    rows = cursor.fetchall()
+    if len(rows) != 1:
+        raise ValueError(f"expected one session row, found {len(rows)}")
+    row = dict(zip(columns, rows[0]))
+    # В старых файлах (схема v2) нет api_id
+    return {field: row.get(field) for field in SESSION_FIELDS}
+
+def read_session_file(path: str) -> tuple[dict, list[tuple]]:
+    connection = open_session_file(path)
+    try:
+        session = read_session_row(connection)
+        peers = connection.execute(f"SELECT {', '.join(PEER_FIELDS)} FROM peers").fetchall()
+    finally:
+        connection.close()
+    return session, peers
+
+def write_session_file(path: str, session: dict, peers: list[tuple]) -> None:
+    temp_path = f"{path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.execute("INSERT INTO version VALUES (?)", (SQLiteStorage.VERSION,))
+            connection.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               tuple(session[field] for field in SESSION_FIELDS))
+            connection.executemany(f"INSERT INTO peers ({', '.join(PEER_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)", peers)
+    finally:
+        connection.close()
+    os.replace(temp_path, path)
+
+# Поля сессии держим в памяти, пиры читаем из общей базы по индексу, когда они понадобятся
+class SharedStorage(Storage):
+    USERNAME_TTL = SQLiteStorage.USERNAME_TTL
+
+    def __init__(self, name: str, store: SessionStore = session_store):
+        super().__init__(name)
+        self.store = store
+        self.session = None
+        self.pending_peers = {}
+
+    async def open(self):
+        self.session = await self.store.load(self.name) or {
+            'dc_id': 2, 'api_id': None, 'test_mode': None, 'auth_key': None,
+            'date': 0, 'user_id': None, 'is_bot': None
+        }
+
+    async def flush(self):
+        peers = list(self.pending_peers.values())
+        self.pending_peers.clear()
+        await self.store.save(self.name, self.session, peers)
+
+    async def save(self):
+        await self.date(int(clock.time()))
+
+    async def close(self):
+        if self.session is not None:
+            await self.flush()
+
+    async def delete(self):
+        self.pending_peers.clear()
+        await self.store.delete(self.name)
+
+    async def update_peers(self, peers: list[tuple[int, int, str, str, str]]):
+        # Пиры копятся в памяти и пишутся одной транзакцией при save/close
+        now = int(clock.time())
+        for peer in peers:
+            self.pending_peers[peer[0]] = (*peer, now)
+
+    async def find_peer(self, column: str, value) -> tuple | None:
+        index = PEER_FIELDS.index(column)
+        pending = [peer for peer in self.pending_peers.values() if peer[index] == value]
+        if pending:
+            return max(pending, key=lambda peer: peer[5])
+        return await self.store.get_peer(self.name, column, value)
+
+    async def get_peer_by_id(self, peer_id: int):
+        peer = await self.find_peer('id', peer_id)
+        if peer is None:
+            raise KeyError(f"ID not found: {peer_id}")
+        return get_input_peer(*peer[:3])
+
+    async def get_peer_by_username(self, username: str):
+        peer = await self.find_peer('username', username)
+        if peer is None:
+            raise KeyError(f"Username not found: {username}")
+        if abs(clock.time() - peer[5]) > self.USERNAME_TTL:
+            raise KeyError(f"Username expired: {username}")
+        return get_input_peer(*peer[:3])
+
+    async def get_peer_by_phone_number(self, phone_number: str):
+        peer = await self.find_peer('phone_number', phone_number)
+        if peer is None:
+            raise KeyError(f"Phone number not found: {phone_number}")
+        return get_input_peer(*peer[:3])
+
+    async def _accessor(self, field: str, value):
+        if value is object:
+            return self.session[field]
+        if self.session[field] != value:
+            # Поля сессии меняются только при авторизации, пишем их сразу, чтобы не потерять ключ
+            self.session[field] = value
+            await self.flush()
+
+    async def dc_id(self, value: int = object):
+        return await self._accessor('dc_id', value)
+
+    async def api_id(self, value: int = object):
+        return await self._accessor('api_id', value)
+
+    async def test_mode(self, value: bool = object):
+        return await self._accessor('test_mode', value)
+
+    async def auth_key(self, value: bytes = object):
+        return await self._accessor('auth_key', value)
+
+    async def date(self, value: int = object):
+        return await self._accessor('date', value)
+
+    async def user_id(self, value: int = object):
+        return await self._accessor('user_id', value)
+
+    async def is_bot(self, value: bool = object):
+        return await self._accessor('is_bot', value)
+
+def get_file_session_names(directory: str = SESSIONS_DIR) -> list[str]:
+    with os.scandir(directory) as entries:
+        return sorted(entry.name[:-len('.session')] for entry in entries
+                      if entry.name.endswith('.session') and entry.is_file())
+
+def import_sessions(directory: str, session_names: list[str] | None = None, force: bool = False) -> int:
+    stored = set(session_store.get_session_names_sync())
+    imported = 0
+    for session_name in session_names or get_file_session_names(directory):
+        if session_name in stored and not force:
+            logger.info(f"{session_name} | Already in the shared store, skipping (use --force to overwrite)")
+            continue
+        try:
+            peers = session_store.import_file(session_name, os.path.join(directory, f"{session_name}.session"))
+        except (sqlite3.Error, ValueError) as error:
+            logger.error(f"{session_name} | Cannot import session file: {error}")
+            continue
+        logger.success(f"{session_name} | Imported with {peers} cached peers")
+        imported += 1
+    return imported
+
+def export_sessions(directory: str, session_names: list[str] | None = None, force: bool = False) -> int:
+    os.makedirs(directory, exist_ok=True)
+    exported = 0
+    for session_name in session_names or session_store.get_session_names_sync():
+        path = os.path.join(directory, f"{session_name}.session")
+        if os.path.exists(path) and not force:
+            logger.info(f"{session_name} | {path} already exists, skipping (use --force to overwrite)")
+            continue
+        try:
+            peers = session_store.export_file(session_name, path)
+        except KeyError as error:
+            logger.error(f"{session_name} | {error}")
+            continue
+        logger.success(f"{session_name} | Exported to {path} with {peers} cached peers")
+        exported += 1
+    return exported
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bot.utils.session_storage",
+                                     description="Move Pyrogram sessions between .session files and the shared store")
+    parser.add_argument("action", choices=("import", "export"),
+                        help="import: .session files into the shared store, export: shared store into .session files")
+    parser.add_argument("-s", "--sessions", nargs="+", help="Session names (default: all)")
+    parser.add_argument("-d", "--dir", default=SESSIONS_DIR, help="Directory with .session files")
+    parser.add_argument("--force", action="store_true", help="Overwrite sessions that already exist on the other side")
+    args = parser.parse_args()
+
+    if args.action == 'import':
+        count = import_sessions(args.dir, args.sessions, args.force)
+        logger.info(f"Imported {count} sessions into {settings.STATE_DB_PATH}. "
+                    f"Set SESSION_STORAGE=shared to use them")
+    else:
+        count = export_sessions(args.dir, args.sessions, args.force)
+        logger.info(f"Exported {count} sessions to {args.dir}")
+
+if __name__ == '__main__':
+    main()
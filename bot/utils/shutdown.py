@@ -0,0 +1,64 @@
+import asyncio
+import signal
+
+from contextlib import contextmanager
+
+from bot.config import settings
+from bot.utils import logger
+
+class ShutdownCoordinator:
+    def __init__(self):
+        self.stopping = False
+        self.event = asyncio.Event()
+        self.callbacks = set()
+        self.active = 0
+        self.loop = None
+
+    def install(self, signals: tuple = (signal.SIGINT, signal.SIGTERM)) -> None:
+        self.loop = asyncio.get_running_loop()
+        # signal.signal, а не loop.add_signal_handler: так работает и на Windows,
+        # и блокирующий input() в меню по-прежнему прерывается
+        for signum in signals:
+            signal.signal(signum, self.handle_signal)
+
+    def handle_signal(self, signum, frame) -> None:
+        if not self.active or self.stopping:
+            # В меню или при повторном сигнале выходим сразу
+            raise KeyboardInterrupt
+        self.loop.call_soon_threadsafe(self.request, signal.Signals(signum).name)
+
+    def request(self, reason: str = '') -> None:
+        if self.stopping:
+            return
+
+        self.stopping = True
+        self.event.set()
+        logger.info(f"Shutdown requested{f' ({reason})' if reason else ''}. Waiting up to {settings.SHUTDOWN_TIMEOUT}s "
+                    f"for running cycles, press Ctrl+C again to stop immediately")
+        for callback in list(self.callbacks):
+            callback()
+
+    async def sleep(self, delay: float) -> None:
+        if self.stopping:
+            return
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    @contextmanager
+    def guard(self, callback=None):
+        self.active += 1
+        if callback is not None:
+            self.callbacks.add(callback)
+        try:
+            yield self
+        finally:
+            self.callbacks.discard(callback)
+            self.active -= 1
+            if not self.active:
+                # Из меню бота можно запустить снова
+                self.stopping = False
+                self.event.clear()
+
+shutdown = ShutdownCoordinator()
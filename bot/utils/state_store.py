@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from bot.config import settings
+from bot.utils.clock import clock
+
+class StateStore:
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.connection = None
+        self.lock = threading.RLock()
+        # Все обращения к SQLite идут через один поток, чтобы не блокировать event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-store')
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            path = self.path or settings.STATE_DB_PATH
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_state ("
+                "session_name TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "PRIMARY KEY (session_name, key))"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS session_state_key ON session_state (key)")
+            self.connection.commit()
+
+        return self.connection
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def _get_entry(self, session_name: str, key: str) -> tuple[Any, float] | None:
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT value, updated_at FROM session_state WHERE session_name = ? AND key = ?",
+                (session_name, key)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _get_all(self, key: str) -> dict[str, Any]:
+        with self.lock:
+            rows = self._connect().execute(
+                "SELECT session_name, value FROM session_state WHERE key = ?", (key,)
+            ).fetchall()
+        return {session_name: json.loads(value) for session_name, value in rows}
+
+    def _set_many(self, items: list[tuple[str, str, Any]]) -> None:
+        now = clock.time()
+        rows = [(session_name, key, json.dumps(value), now) for session_name, key, value in items]
+        with self.lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO session_state (session_name, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (session_name, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    rows
+                )
+
+    def _delete(self, session_name: str, key: str) -> None:
+        with self.lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "DELETE FROM session_state WHERE session_name = ? AND key = ?", (session_name, key)
+                )
+
+    def _close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def _call(self, func, *args):
+        with self.lock:
+            return func(self._connect(), *args)
+
+    # Для модулей со своими таблицами в той же базе: func получает соединение и выполняется в потоке хранилища
+    def call_sync(self, func, *args):
+        return self._call(func, *args)
+
+    async def call(self, func, *args):
+        return await self._run(self._call, func, *args)
+
+    # Синхронный доступ для кода, который выполняется вне event loop (загрузка при старте, регистрация)
+    def get_sync(self, session_name: str, key: str, default: Any = None) -> Any:
+        entry = self._get_entry(session_name, key)
+        return entry[0] if entry else default
+
+    def get_all_sync(self, key: str) -> dict[str, Any]:
+        return self._get_all(key)
+
+    def set_many_sync(self, items: list[tuple[str, str, Any]]) -> None:
+        self._set_many(items)
+
+    async def get_entry(self, session_name: str, key: str) -> tuple[Any, float] | None:
+        return await self._run(self._get_entry, session_name, key)
+
+    async def get(self, session_name: str, key: str, default: Any = None) -> Any:
+        entry = await self.get_entry(session_name, key)
+        return entry[0] if entry else default
+
+    async def get_all(self, key: str) -> dict[str, Any]:
+        return await self._run(self._get_all, key)
+
+    async def set(self, session_name: str, key: str, value: Any) -> None:
+        await self._run(self._set_many, [(session_name, key, value)])
+
+    async def set_many(self, items: list[tuple[str, str, Any]]) -> None:
+        await self._run(self._set_many, items)
+
+    async def delete(self, session_name: str, key: str) -> None:
+        await self._run(self._delete, session_name, key)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+
+state_store = StateStore()
@@ -0,0 +1,159 @@
+import asyncio
+import multiprocessing
+import queue
+import signal
+import zlib
+
+from time import time
+
+from bot.config import settings
+from bot.utils import logger, event_loop
+from bot.utils.shutdown import shutdown
+
+def get_shard(session_name: str, shards: int) -> int:
+    return zlib.crc32(session_name.encode()) % shards
+
+def run_worker(shard: int, shards: int, status_queue, session_names: list[str] | None = None) -> None:
+    # Останавливает воркеров только супервизор, через SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    event_loop.run(worker_main(shard, shards, status_queue, session_names))
+
+async def worker_main(shard: int, shards: int, status_queue, session_names: list[str] | None = None) -> None:
+    from bot.core.scheduler import Scheduler
+    from bot.utils.launcher import get_session_names, get_run_session_names, get_proxies
+    from bot.utils.connection_manager import connection_manager
+    from bot.utils.tg_manager import tg_manager
+    from bot.utils.state_store import state_store
+    from bot.utils.metrics import start_metrics_server
+    from bot.utils.rate_limiter import rate_limiter
+    from bot.utils.profiling import profiler
+
+    shutdown.install(signals=(signal.SIGTERM,))
+
+    if session_names is None:
+        session_names = get_session_names()
+    session_names = [name for name in session_names if get_shard(name, shards) == shard]
+    if not session_names:
+        logger.info(f"Worker {shard} | No sessions in this shard")
+        return
+
+    rate_limiter.scale = 1 / shards
+
+    # Каждый воркер отдаёт свои метрики на отдельном порту
+    metrics_runner = await start_metrics_server(settings.METRICS_PORT + 1 + shard) if settings.METRICS_ENABLED else None
+    if settings.PROFILING_ENABLED:
+        profiler.start()
+
+    session_names = get_run_session_names(session_names=session_names)
+    proxies = get_proxies() if settings.USE_PROXY else {}
+    scheduler = Scheduler()
+
+    async def report_status():
+        while True:
+            upcoming = scheduler.upcoming(1)
+            status_queue.put({
+                'shard': shard,
+                'sessions': len(scheduler.wake_times),
+                'active': scheduler.active,
+                'next_wake': upcoming[0][0] if upcoming else None
+            })
+            await asyncio.sleep(settings.SUPERVISOR_STATUS_INTERVAL)
+
+    reporter = asyncio.create_task(report_status())
+    try:
+        await scheduler.run(session_names=session_names, proxies=proxies)
+    finally:
+        reporter.cancel()
+        profiler.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await asyncio.gather(connection_manager.close_all(), tg_manager.close_all())
+        await state_store.close()
+
+class Supervisor:
+    def __init__(self, workers: int, session_names: list[str] | None = None):
+        self.workers = workers
+        self.session_names = session_names
+        self.context = multiprocessing.get_context('spawn')
+        self.status_queue = self.context.Queue()
+        self.processes = {}
+        self.restarts = {}
+        self.status = {}
+
+    def start_worker(self, shard: int) -> None:
+        process = self.context.Process(
+            target=run_worker,
+            args=(shard, self.workers, self.status_queue, self.session_names),
+            name=f"agent301-worker-{shard}"
+        )
+        process.start()
+        self.processes[shard] = process
+        logger.info(f"Worker {shard} | Started with pid {process.pid}")
+
+    def collect_status(self) -> None:
+        while True:
+            try:
+                status = self.status_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.status[status['shard']] = status
+
+    def log_status(self) -> None:
+        sessions = sum(status['sessions'] for status in self.status.values())
+        active = sum(status['active'] for status in self.status.values())
+        next_wakes = [status['next_wake'] for status in self.status.values() if status['next_wake']]
+        next_wake = f"{max(int(min(next_wakes) - time()), 0)}s" if next_wakes else "-"
+        logger.info(
+            f"Supervisor | Workers: <cyan>{len(self.processes)}</cyan> | Sessions: <cyan>{sessions}</cyan> "
+            f"| Active: <cyan>{active}</cyan> | Next wake up in <y>{next_wake}</y>")
+
+    async def run(self) -> None:
+        for shard in range(self.workers):
+            self.start_worker(shard)
+
+        try:
+            with shutdown.guard():
+                await self.monitor()
+        finally:
+            await self.stop_workers()
+
+    async def monitor(self) -> None:
+        last_report = time()
+        while self.processes and not shutdown.stopping:
+            await shutdown.sleep(1)
+            self.collect_status()
+
+            for shard, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+
+                del self.processes[shard]
+                if process.exitcode == 0:
+                    logger.info(f"Worker {shard} | Finished")
+                    self.status.pop(shard, None)
+                    continue
+
+                self.restarts[shard] = self.restarts.get(shard, 0) + 1
+                delay = min(settings.SUPERVISOR_RESTART_DELAY * self.restarts[shard], 300)
+                logger.error(
+                    f"Worker {shard} | Crashed with exit code {process.exitcode}. Restarting in {delay} seconds.")
+                await shutdown.sleep(delay)
+                if shutdown.stopping:
+                    return
+                self.start_worker(shard)
+
+            if time() - last_report >= settings.SUPERVISOR_STATUS_INTERVAL:
+                self.log_status()
+                last_report = time()
+
+    async def stop_workers(self) -> None:
+        processes = [process for process in self.processes.values() if process.is_alive()]
+        for process in processes:
+            process.terminate()
+
+        # Воркеры сами доводят текущие циклы до конца, ждём их не блокируя цикл событий
+        await asyncio.gather(*(asyncio.to_thread(process.join, settings.SHUTDOWN_TIMEOUT + 10) for process in processes))
+        for process in processes:
+            if process.is_alive():
+                logger.warning(f"Worker | {process.name} did not stop in time, killing it")
+                process.kill()
@@ -0,0 +1,119 @@
+import asyncio
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pyrogram import Client
+from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered
+
+from bot.config import settings
+from bot.exceptions import InvalidSession
+from bot.utils.session_storage import SharedStorage
+
+class TelegramClientManager:
+    def __init__(self):
+        # LRU: клиент создаётся, когда сессии нужен логин, самые давние закрываются при переполнении
+        self.clients = OrderedDict()
+        self.users = {}
+        self.locks = {}
+        self.disconnect_tasks = {}
+
+    def create_client(self, session_name: str, proxy: dict | None = None) -> Client:
+        client = Client(
+            name=session_name,
+            api_id=settings.API_ID,
+            api_hash=settings.API_HASH,
+            workdir="sessions/",
+            proxy=proxy
+        )
+        if settings.SESSION_STORAGE == 'shared':
+            # В Pyrogram 2.0 нет параметра для своего хранилища, поэтому подменяем его до connect()
+            client.storage = SharedStorage(session_name)
+        return client
+
+    async def get_client(self, session_name: str, proxy: dict | None = None) -> Client:
+        client = self.clients.get(session_name)
+        if client is None:
+            client = self.clients[session_name] = self.create_client(session_name, proxy)
+            # Сессия уже в users, так что её собственный клиент не вытесняется
+            await self.evict(settings.TG_CLIENT_CACHE_SIZE)
+        else:
+            self.clients.move_to_end(session_name)
+            client.proxy = proxy
+        return client
+
+    async def evict(self, size: int) -> None:
+        # Занятые клиенты не трогаем, поэтому при нехватке места кэш временно больше лимита
+        idle = [name for name in self.clients if name not in self.users]
+        excess = max(len(self.clients) - size, 0)
+        evicted = [(name, self.detach(name)) for name in idle[:excess]]
+        await asyncio.gather(*(self.close(name, client) for name, client in evicted))
+
+    def detach(self, session_name: str) -> Client | None:
+        task = self.disconnect_tasks.pop(session_name, None)
+        if task:
+            task.cancel()
+        return self.clients.pop(session_name, None)
+
+    async def close(self, session_name: str, client: Client | None) -> None:
+        if client is not None:
+            async with self.get_lock(session_name):
+                if client.is_connected:
+                    await self.close_client(client)
+
+        lock = self.locks.get(session_name)
+        if lock is not None and not lock.locked() and session_name not in self.clients:
+            del self.locks[session_name]
+
+    def get_lock(self, session_name: str) -> asyncio.Lock:
+        return self.locks.setdefault(session_name, asyncio.Lock())
+
+    @asynccontextmanager
+    async def connect(self, session_name: str, proxy: dict | None = None):
+        self.users[session_name] = self.users.get(session_name, 0) + 1
+
+        task = self.disconnect_tasks.pop(session_name, None)
+        if task:
+            task.cancel()
+
+        try:
+            client = await self.get_client(session_name, proxy)
+            async with self.get_lock(session_name):
+                if not client.is_connected:
+                    try:
+                        await client.connect()
+                    except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
+                        raise InvalidSession(session_name)
+
+            yield client
+        finally:
+            self.users[session_name] -= 1
+            if self.users[session_name] <= 0:
+                del self.users[session_name]
+                self.disconnect_tasks[session_name] = asyncio.create_task(self._disconnect_later(session_name))
+
+    async def _disconnect_later(self, session_name: str):
+        # Клиент остаётся подключённым, пока может снова понадобиться
+        await asyncio.sleep(settings.TG_CLIENT_IDLE_TIMEOUT)
+        self.disconnect_tasks.pop(session_name, None)
+        if session_name not in self.users:
+            await self.close(session_name, self.detach(session_name))
+
+    async def close_all(self):
+        for task in list(self.disconnect_tasks.values()):
+            task.cancel()
+        self.disconnect_tasks.clear()
+
+        clients = list(self.clients.values())
+        self.clients.clear()
+        self.users.clear()
+        self.locks.clear()
+
+        await asyncio.gather(*(self.close_client(client) for client in clients if client.is_connected))
+
+    async def close_client(self, client: Client):
+        try:
+            await client.disconnect()
+        except Exception as e:
+            print(f"Error disconnecting client {client.name}: {e}")
+
+tg_manager = TelegramClientManager()
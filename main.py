@@ -1,39 +1,47 @@
 import asyncio
 import sys
-import os
-import signal
 
-from bot.utils.banner import banner
+from bot.config import settings
 from bot.utils.logger import logger
-from bot.utils.launcher import process
+from bot.utils.metrics import start_metrics_server
+from bot.utils.launcher import process, run_headless
 from bot.utils.connection_manager import connection_manager
+from bot.utils.tg_manager import tg_manager
+from bot.utils.state_store import state_store
+from bot.utils.shutdown import shutdown
+from bot.utils.profiling import profiler
+from bot.utils import event_loop
 
-def suppress_errors():
-    sys.stderr = open(os.devnull, 'w')
-
-async def main():
+async def main(headless: bool = False):
+    shutdown.install()
+    metrics_runner = await start_metrics_server() if settings.METRICS_ENABLED else None
+    if settings.PROFILING_ENABLED:
+        profiler.start()
     try:
-        await process()
+        if headless:
+            await run_headless(sys.argv[2:])
+        else:
+            await process()
     except asyncio.CancelledError:
         pass
     finally:
-        await connection_manager.close_all()
-
-def signal_handler(signum, frame):
-    sys.exit(0)
+        profiler.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await asyncio.gather(connection_manager.close_all(), tg_manager.close_all())
+        await state_store.close()
+        await logger.complete()
 
 
 if __name__ == '__main__':
-    banner()
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    headless = len(sys.argv) > 1 and sys.argv[1] == 'run'
+    if not headless:
+        from bot.utils.banner import banner
+        banner()
 
     try:
-        asyncio.run(main())
+        event_loop.run(main(headless))
     except KeyboardInterrupt:
         pass
-    except SystemExit:
-        pass
     finally:
         logger.info("<lr>Bot stopped by user</lr>")
-        suppress_errors()